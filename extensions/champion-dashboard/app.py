@@ -1,11 +1,44 @@
 """Posit Connect Metrics Dashboard"""
 
-from shiny import App, ui, render, reactive
+from shiny import App, ui, render, reactive, req
 from posit.connect import Client
-from io import BytesIO, TextIOWrapper
+import asyncio
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
 import requests
-from prometheus_client import parser
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Generic, Iterable, List, Mapping, Tuple, TypeVar, Optional
+
+METRICS_URL = "http://localhost:3232/metrics"
+
+# Every session shares one scrape of the metrics endpoint, which is repeated
+# at most once per METRICS_CACHE_TTL seconds
+METRICS_CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "30"))
+
+# The server settings and installed versions shown under System Info rarely
+# change, so every session shares them for this many seconds, or until someone
+# refreshes the card
+SYSTEM_INFO_CACHE_TTL = float(os.getenv("SYSTEM_INFO_CACHE_TTL", "3600"))
+
+# While anyone is viewing the dashboard, the metrics are scraped in the
+# background this often and any changes are pushed to every open session
+METRICS_REFRESH_INTERVAL = float(os.getenv("METRICS_REFRESH_INTERVAL", "30"))
+
+# The metric families the dashboard shows
+DASHBOARD_FAMILIES = (
+    "users_active",
+    "content_count",
+    "integrations_count",
+    "application_count",
+    "schedule_count",
+    "process_count",
+)
 
 DASHBOARD_CSS = """
     body {
@@ -249,82 +282,297 @@ DASHBOARD_CSS = """
     }
 """
 
-def fetch_all_prometheus_metrics(url: str) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+# Samples of a family can be named after it with one of these suffixes, like
+# the `_bucket`, `_sum` and `_count` series of a histogram
+SAMPLE_SUFFIXES = ("", "_total", "_created", "_bucket", "_sum", "_count", "_gsum", "_gcount", "_info")
+
+LABEL_PATTERN = re.compile(r'\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*=\s*"((?:[^"\\]|\\.)*)"\s*,?')
+LABEL_ESCAPES = re.compile(r"\\(.)")
+
+def parse_labels(text: str) -> Dict[str, str]:
+    labels = {}
+    position = 0
+    while position < len(text):
+        match = LABEL_PATTERN.match(text, position)
+        if match is None:
+            if text[position:].strip():
+                raise ValueError(f"Invalid labels: {text}")
+            break
+        name, value = match.groups()
+        labels[name] = LABEL_ESCAPES.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), value)
+        position = match.end()
+    return labels
+
+def parse_prometheus_lines(lines: Iterable[bytes], families: Iterable[str]) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """
+    Parse the samples of `families` out of Prometheus text exposition lines.
+    Any other sample is skipped by its name alone, without parsing its labels
+    or value, and comments aren't looked at.
+    """
+    families_by_sample = {
+        (family + suffix).encode(): family
+        for family in families
+        for suffix in SAMPLE_SUFFIXES
+    }
+    metrics = {}
+    for line in lines:
+        if not line or line.startswith(b"#"):
+            continue
+        end = len(line)
+        for delimiter in (b"{", b" "):
+            found = line.find(delimiter, 0, end)
+            if found != -1:
+                end = found
+        family = families_by_sample.get(line[:end])
+        if family is None:
+            continue
+
+        text = line.decode("utf-8")
+        if text[end] == "{":
+            labels_end = text.rindex("}")
+            labels = parse_labels(text[end + 1:labels_end])
+            rest = text[labels_end + 1:]
+        else:
+            labels = {}
+            rest = text[end:]
+        # The value may be followed by a timestamp, which isn't kept
+        value = float(rest.split()[0])
+        metrics.setdefault(family, []).append((labels, value))
+    return metrics
+
+def fetch_prometheus_metrics(url: str, families: Iterable[str] = DASHBOARD_FAMILIES) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    """
+    Scrape the samples of `families` from a metrics endpoint. The response is
+    parsed as it is read, so the rest of a large exposition, like the Go
+    runtime and histogram series, is never held in memory as a whole.
+    """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        text_fd = TextIOWrapper(BytesIO(response.content), encoding="utf-8")
-        metric_families = parser.text_fd_to_metric_families(text_fd)
-
-        metrics = {}
-        for family in metric_families:
-            metric_data = []
-            for sample in family.samples:
-                metric_data.append((sample.labels, sample.value))
-            metrics[family.name] = metric_data
-
-        return metrics
-    except requests.RequestException as e:
+        with requests.get(url, stream=True) as response:
+            response.raise_for_status()
+            return parse_prometheus_lines(response.iter_lines(chunk_size=65536), families)
+    except (requests.RequestException, ValueError) as e:
         print(f"Error fetching metrics from {url}: {e}")
         return {}
 
-def get_user_activity_metrics(metrics: Dict) -> Dict[str, Optional[int]]:
-    users_active = metrics.get('users_active', [])
-    result = {'24h': None, '7d': None, '30d': None, '1y': None}
-
-    for labels, value in users_active:
-        window = labels.get('window')
-        if window in result:
-            result[window] = int(value)
-
-    return result
+# Labels the OpenTelemetry Prometheus exporter adds to every sample, which
+# aren't part of how a family is broken down
+SCOPE_LABELS = ("otel_scope_name", "otel_scope_version", "otel_scope_schema_url")
+
+@dataclass(frozen=True, slots=True)
+class Sample:
+    labels: Tuple[Tuple[str, str], ...]
+    value: float
+
+@dataclass(frozen=True, slots=True)
+class MetricFamily:
+    """
+    The samples of one metric family, indexed by the names of the labels they
+    carry. Each breakdown of a family, like content by `content_type` or by
+    `runtime_language` and `runtime_version`, is one entry of the index.
+    """
+    name: str
+    samples: Tuple[Sample, ...]
+    index: Mapping[Tuple[str, ...], Mapping[Tuple[str, ...], float]]
+    digest: str
+
+    @classmethod
+    def from_samples(cls, name: str, samples: List[Tuple[Dict[str, str], float]]) -> "MetricFamily":
+        records = tuple(
+            Sample(tuple(sorted((k, v) for k, v in labels.items() if k not in SCOPE_LABELS)), value)
+            for labels, value in samples
+        )
+        index = {}
+        for sample in records:
+            keys = tuple(k for k, _ in sample.labels)
+            index.setdefault(keys, {})[tuple(v for _, v in sample.labels)] = sample.value
+        return cls(
+            name=name,
+            samples=records,
+            index=MappingProxyType({keys: MappingProxyType(values) for keys, values in index.items()}),
+            digest=hashlib.blake2b(repr(records).encode(), digest_size=16).hexdigest(),
+        )
 
-def get_content_stats(metrics: Dict) -> Dict:
-    content_count = metrics.get('content_count', [])
+    def by(self, *keys: str) -> Mapping[Tuple[str, ...], float]:
+        """The samples labelled with exactly `keys`, by their values for `keys`"""
+        sorted_keys = tuple(sorted(keys))
+        values = self.index.get(sorted_keys, {})
+        if sorted_keys == keys:
+            return values
+        order = [sorted_keys.index(key) for key in keys]
+        return {tuple(labels[i] for i in order): value for labels, value in values.items()}
+
+    def total(self) -> Optional[float]:
+        """The value of the sample without labels"""
+        return self.index.get((), {}).get(())
+
+@dataclass(frozen=True, slots=True)
+class MetricSnapshot:
+    """
+    One scrape, indexed once. Alongside each family it holds the figures the
+    panels and breakdowns show for it, so rendering them is a lookup.
+    """
+    families: Mapping[str, MetricFamily]
+    summaries: Mapping[str, object]
+
+    @classmethod
+    def from_metrics(cls, metrics: Dict[str, List[Tuple[Dict[str, str], float]]]) -> "MetricSnapshot":
+        families = {
+            name: MetricFamily.from_samples(name, metrics.get(name, []))
+            for name in DASHBOARD_FAMILIES
+        }
+        return cls(
+            families=MappingProxyType(families),
+            summaries=MappingProxyType({
+                name: FAMILY_SUMMARIES[name](family) for name, family in families.items()
+            }),
+        )
 
-    stats = {
-        "total": 0,
-        "by_type": {},
-        "runtime_versions": {}
-    }
+    def empty(self) -> bool:
+        return not any(family.samples for family in self.families.values())
+
+T = TypeVar("T")
+
+class SharedCache(Generic[T]):
+    """
+    The most recent result of `load`, shared by every session. When it is
+    older than `ttl` seconds the next caller loads it again, and any other
+    callers arriving meanwhile wait for that load rather than starting their
+    own.
+    """
+
+    def __init__(self, load: Callable[[], T], ttl: float):
+        self.load = load
+        self.ttl = ttl
+        self._value: Optional[T] = None
+        self._loaded_at = 0.0
+        # Bumped by invalidate; a value loaded before the latest bump is stale
+        self._generation = 0
+        self._loaded_generation = -1
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return (
+            self._loaded_generation == self._generation
+            and time.monotonic() - self._loaded_at < self.ttl
+        )
 
-    for labels, value in content_count:
-        content_type = labels.get('content_type')
-        runtime_lang = labels.get('runtime_language')
-        runtime_ver = labels.get('runtime_version')
-        access_type = labels.get('access_type')
+    def get(self) -> T:
+        if self._fresh():
+            return self._value
+        with self._lock:
+            # Another caller may have loaded it while this one waited
+            if not self._fresh():
+                generation = self._generation
+                self._value = self.load()
+                self._loaded_at = time.monotonic()
+                self._loaded_generation = generation
+            return self._value
+
+    def invalidate(self):
+        # Doesn't take the lock, which a load in progress holds, so it never
+        # waits; that load's value is stale once it arrives
+        self._generation += 1
+
+metrics_cache = SharedCache(
+    lambda: MetricSnapshot.from_metrics(fetch_prometheus_metrics(METRICS_URL)),
+    METRICS_CACHE_TTL,
+)
 
-        if not content_type and not runtime_lang and not access_type:
-            stats["total"] = int(value)
+# The latest summary of each family, shared by every session. A family's value
+# is only replaced when its samples change, so an output only re-renders when
+# a family it reads has changed. They are None until the first scrape.
+family_values: Dict[str, reactive.Value] = {
+    name: reactive.Value(None) for name in DASHBOARD_FAMILIES
+}
+family_hashes: Dict[str, str] = {}
+
+# The background scraper, and the number of sessions it is running for
+scraper = {"task": None, "sessions": 0}
+
+async def publish_metrics(snapshot: MetricSnapshot):
+    changed = {}
+    for name, family in snapshot.families.items():
+        if family_hashes.get(name) != family.digest:
+            family_hashes[name] = family.digest
+            changed[name] = snapshot.summaries[name]
+    if not changed:
+        return
+
+    async with reactive.lock():
+        for name, summary in changed.items():
+            family_values[name].set(summary)
+        await reactive.flush()
+
+async def scrape_metrics():
+    while scraper["sessions"] > 0:
+        # A failed scrape leaves the last numbers on screen
+        try:
+            snapshot = await asyncio.to_thread(metrics_cache.get)
+            if not snapshot.empty() or not family_hashes:
+                await publish_metrics(snapshot)
+        except Exception as e:
+            print(f"Error publishing metrics: {e}")
+        await asyncio.sleep(METRICS_REFRESH_INTERVAL)
+
+def watch_metrics(session):
+    """Keep the background scraper running for as long as `session` is open"""
+    scraper["sessions"] += 1
+
+    def stop_watching():
+        scraper["sessions"] -= 1
+
+    session.on_ended(stop_watching)
+    if scraper["task"] is None or scraper["task"].done():
+        scraper["task"] = asyncio.create_task(scrape_metrics())
+
+def current_summary(family: str):
+    """The latest summary of `family`, waiting for the first scrape if need be"""
+    summary = family_values[family]()
+    req(summary is not None)
+    return summary
+
+def as_count(value: float) -> int:
+    """A gauge's value as a whole count, with NaN and infinities counted as 0"""
+    return int(value) if math.isfinite(value) else 0
+
+def get_user_activity_metrics(users_active: MetricFamily) -> Dict[str, Optional[int]]:
+    result = {'24h': None, '7d': None, '30d': None, '1y': None}
 
-        if content_type and not runtime_lang and not access_type:
-            display_type = "Other" if content_type == "unknown" else content_type
-            stats["by_type"][display_type] = int(value)
+    for (window,), value in users_active.by('window').items():
+        if window in result:
+            result[window] = as_count(value)
 
-        if runtime_lang and runtime_ver and not content_type and not access_type:
-            runtime_key = f"{runtime_lang} {runtime_ver}"
-            stats["runtime_versions"][runtime_key] = int(value)
+    return result
 
-    return stats
+def get_content_stats(content_count: MetricFamily) -> Dict:
+    total = content_count.total()
 
-def get_integration_metrics(metrics: Dict) -> Dict:
-    integrations_count = metrics.get('integrations_count', [])
+    return {
+        "total": as_count(total) if total is not None else 0,
+        "by_type": {
+            "Other" if content_type == "unknown" else content_type: as_count(value)
+            for (content_type,), value in content_count.by('content_type').items()
+        },
+        "runtime_versions": {
+            f"{runtime_lang} {runtime_ver}": as_count(value)
+            for (runtime_lang, runtime_ver), value
+            in content_count.by('runtime_language', 'runtime_version').items()
+        },
+        "access_control": get_access_control_stats(content_count),
+    }
 
+def get_integration_metrics(integrations_count: MetricFamily) -> Dict:
     matrix = {}
     templates = set()
     auth_types = set()
 
-    for labels, value in integrations_count:
-        template = labels.get('integration_template')
-        auth_type = labels.get('integration_auth_type')
-
-        if template and auth_type:
-            templates.add(template)
-            auth_types.add(auth_type)
+    for (template, auth_type), value in integrations_count.by('integration_template', 'integration_auth_type').items():
+        templates.add(template)
+        auth_types.add(auth_type)
 
-            if template not in matrix:
-                matrix[template] = {}
-            matrix[template][auth_type] = int(value)
+        if template not in matrix:
+            matrix[template] = {}
+        matrix[template][auth_type] = as_count(value)
 
     return {
         'matrix': matrix,
@@ -333,8 +581,18 @@ def get_integration_metrics(metrics: Dict) -> Dict:
     }
 
 def get_system_info(client):
-    response = client.get("server_settings")
-    settings = response.json()
+    # The settings and each runtime's installations are fetched at once
+    paths = [
+        "server_settings",
+        "v1/server_settings/r",
+        "v1/server_settings/python",
+        "v1/server_settings/quarto",
+        "v1/server_settings/tensorflow",
+    ]
+    with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+        settings, r_settings, python_settings, quarto_settings, tensorflow_settings = executor.map(
+            lambda path: client.get(path).json(), paths
+        )
 
     license_info = settings.get('license', {})
     tier = license_info.get('tier', 'N/A')
@@ -353,10 +611,10 @@ def get_system_info(client):
         versions = [inst.get('version', '') for inst in installations]
         return ", ".join(versions) if versions else "None"
 
-    r_installations = client.get("v1/server_settings/r").json().get('installations', [])
-    python_installations = client.get("v1/server_settings/python").json().get('installations', [])
-    quarto_installations = client.get("v1/server_settings/quarto").json().get('installations', [])
-    tensorflow_installations = client.get("v1/server_settings/tensorflow").json().get('installations', [])
+    r_installations = r_settings.get('installations', [])
+    python_installations = python_settings.get('installations', [])
+    quarto_installations = quarto_settings.get('installations', [])
+    tensorflow_installations = tensorflow_settings.get('installations', [])
 
     r_versions_str = extract_versions(r_installations)
     python_versions_str = extract_versions(python_installations)
@@ -376,74 +634,58 @@ def get_system_info(client):
         "TensorFlow Versions": tensorflow_versions_str
     }
 
-def get_access_control_stats(metrics: Dict) -> Dict[str, int]:
-    content_count = metrics.get('content_count', [])
-    result = {}
+system_info_cache = SharedCache(lambda: get_system_info(Client()), SYSTEM_INFO_CACHE_TTL)
 
+def get_access_control_stats(content_count: MetricFamily) -> Dict[str, int]:
     label_map = {
         "acl": "Specific users/groups",
         "all": "No login required",
         "logged_in": "All users - login required"
     }
 
-    for labels, value in content_count:
-        access_type = labels.get('access_type')
-        if access_type:
-            display_label = label_map.get(access_type, access_type)
-            result[display_label] = int(value)
-
-    return result
+    return {
+        label_map.get(access_type, access_type): as_count(value)
+        for (access_type,), value in content_count.by('access_type').items()
+    }
 
-def get_currently_running(metrics: Dict) -> Dict[str, int]:
-    app_count = get_application_count(metrics)
-    process_count = get_process_count_by_tag(metrics)
+def get_application_count(application_count: MetricFamily) -> Dict:
+    total = application_count.total()
 
     return {
-        "applications": app_count.get('total', 0),
-        "processes": process_count.get('total', 0)
+        'total': as_count(total) if total is not None else 0,
+        'by_type': {
+            application_type: as_count(value)
+            for (application_type,), value in application_count.by('application_type').items()
+        }
     }
 
-def get_application_count(metrics: Dict) -> Dict:
-    application_count = metrics.get('application_count', [])
-    result = {
-        'total': 0,
-        'by_type': {}
+def get_schedule_count_by_status(schedule_count: MetricFamily) -> Dict[str, int]:
+    return {
+        schedule_status: as_count(value)
+        for (schedule_status,), value in schedule_count.by('schedule_status').items()
     }
 
-    for labels, value in application_count:
-        application_type = labels.get('application_type')
-        if not application_type:
-            result['total'] = int(value)
-        else:
-            result['by_type'][application_type] = int(value)
-
-    return result
-
-def get_schedule_count_by_status(metrics: Dict) -> Dict[str, int]:
-    schedule_count = metrics.get('schedule_count', [])
-    result = {}
-
-    for labels, value in schedule_count:
-        schedule_status = labels.get('schedule_status')
-        if schedule_status:
-            result[schedule_status] = int(value)
-
-    return result
-
-def get_process_count_by_tag(metrics: Dict) -> Dict:
-    process_count = metrics.get('process_count', [])
-    by_tag = {}
-
-    for labels, value in process_count:
-        process_tag = labels.get('process_tag')
-        if process_tag:
-            by_tag[process_tag] = int(value)
+def get_process_count_by_tag(process_count: MetricFamily) -> Dict:
+    by_tag = {
+        process_tag: as_count(value)
+        for (process_tag,), value in process_count.by('process_tag').items()
+    }
 
     return {
         'total': sum(by_tag.values()) if by_tag else 0,
         'by_tag': by_tag
     }
 
+# How each family is summarised for the panels and breakdowns that show it
+FAMILY_SUMMARIES = {
+    "users_active": get_user_activity_metrics,
+    "content_count": get_content_stats,
+    "integrations_count": get_integration_metrics,
+    "application_count": get_application_count,
+    "schedule_count": get_schedule_count_by_status,
+    "process_count": get_process_count_by_tag,
+}
+
 def create_content_card(title, *content):
     return ui.div(
         ui.div(title, class_="card-title"),
@@ -490,7 +732,15 @@ app_ui = ui.page_fluid(
             class_="section-grid-2"
         ),
         ui.div(
-            ui.div("System Info", class_="card-title"),
+            ui.div(
+                "System Info",
+                ui.input_action_link(
+                    "refresh_system_info",
+                    "Refresh",
+                    style="margin-left: auto; font-size: 12px; font-weight: 500;"
+                ),
+                class_="card-title"
+            ),
             ui.output_ui("system_info"),
             class_="content-card"
         ),
@@ -499,13 +749,27 @@ app_ui = ui.page_fluid(
 )
 
 def server(input, output, session):
-    metrics = fetch_all_prometheus_metrics("http://localhost:3232/metrics")
-    client = Client()
+    watch_metrics(session)
+
+    # Loaded in the background, so the other cards don't wait for it
+    @reactive.extended_task
+    async def load_system_info():
+        return await asyncio.to_thread(system_info_cache.get)
+
+    @reactive.effect
+    def start_loading_system_info():
+        load_system_info()
+
+    @reactive.effect
+    @reactive.event(input.refresh_system_info)
+    def refresh_system_info():
+        system_info_cache.invalidate()
+        load_system_info()
 
     @output
     @render.ui
     def active_user_stats():
-        user_metrics = get_user_activity_metrics(metrics)
+        user_metrics = current_summary('users_active')
         stat_labels = [("DAU (24h)", '24h'), ("WAU (7d)", '7d'), ("MAU (30d)", '30d'), ("YAU (1y)", '1y')]
         return [
             ui.div(
@@ -519,7 +783,9 @@ def server(input, output, session):
     @output
     @render.ui
     def system_info():
-        info = get_system_info(client)
+        if load_system_info.status() in ("initial", "running"):
+            return ui.div("Loading…", class_="info-label")
+        info = load_system_info.result()
         rows = []
         for label, value in info.items():
             rows.append(
@@ -534,7 +800,7 @@ def server(input, output, session):
     @output
     @render.ui
     def content_stats_grid():
-        stats = get_content_stats(metrics)
+        stats = current_summary('content_count')
 
         col1 = ui.div(
             ui.div(
@@ -610,7 +876,7 @@ def server(input, output, session):
             class_="content-card"
         )
 
-        access_stats = get_access_control_stats(metrics)
+        access_stats = stats["access_control"]
         sorted_access_stats = sorted(access_stats.items(), key=lambda x: x[1], reverse=True)
         access_rows = [
             ui.tags.tr(
@@ -642,7 +908,7 @@ def server(input, output, session):
     @output
     @render.ui
     def integration_metrics_table():
-        integration_data = get_integration_metrics(metrics)
+        integration_data = current_summary('integrations_count')
         matrix = integration_data['matrix']
         templates = integration_data['templates']
         auth_types = integration_data['auth_types']
@@ -674,8 +940,11 @@ def server(input, output, session):
     @output
     @render.ui
     def running_schedule_grid():
-        running_stats = get_currently_running(metrics)
-        schedule_by_status = get_schedule_count_by_status(metrics)
+        running_stats = {
+            "applications": current_summary('application_count')['total'],
+            "processes": current_summary('process_count')['total']
+        }
+        schedule_by_status = current_summary('schedule_count')
         total_scheduled = sum(schedule_by_status.values()) if schedule_by_status else 0
 
         running_items = [
@@ -719,7 +988,7 @@ def server(input, output, session):
     @reactive.effect
     @reactive.event(input.show_app_breakdown)
     def show_application_breakdown():
-        app_count = get_application_count(metrics)
+        app_count = current_summary('application_count')
         sorted_app_count = dict(sorted(app_count['by_type'].items(), key=lambda x: x[1], reverse=True))
         breakdown_items = create_key_value_list(sorted_app_count)
 
@@ -738,7 +1007,7 @@ def server(input, output, session):
     @reactive.effect
     @reactive.event(input.show_process_breakdown)
     def show_process_breakdown():
-        process_count = get_process_count_by_tag(metrics)
+        process_count = current_summary('process_count')
         sorted_process_count = dict(sorted(process_count['by_tag'].items(), key=lambda x: x[1], reverse=True))
         breakdown_items = create_key_value_list(sorted_process_count)
 
@@ -757,7 +1026,7 @@ def server(input, output, session):
     @reactive.effect
     @reactive.event(input.show_schedule_breakdown)
     def show_schedule_breakdown():
-        schedule_by_status = get_schedule_count_by_status(metrics)
+        schedule_by_status = current_summary('schedule_count')
         sorted_schedule = dict(sorted(schedule_by_status.items(), key=lambda x: x[1], reverse=True))
         breakdown_items = create_key_value_list(sorted_schedule)
 
@@ -0,0 +1,151 @@
+"""
+Compare the two ways of reading the dashboard's metrics from a scrape:
+
+- prometheus_client's text parser over the whole response body, keeping every
+  family, as the dashboard read it before
+- the streaming parser, which reads the response in chunks and keeps only
+  the families the dashboard shows, as it reads it now
+
+The exposition is synthetic: the dashboard's families plus the given number
+of other series, shaped like Go runtime gauges and request histograms, e.g.
+
+    python benchmarks/prometheus_parser.py --series 1000 10000 100000
+
+No requests are made to Connect.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO, TextIOWrapper
+
+import requests
+from prometheus_client import parser as prometheus_parser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+
+def make_exposition(series: int) -> bytes:
+    """The dashboard's families followed by `series` other samples"""
+    lines = [
+        "# HELP users_active Number of active users",
+        "# TYPE users_active gauge",
+        *(f'users_active{{window="{w}"}} {i * 10}' for i, w in enumerate(["24h", "7d", "30d", "1y"])),
+        "# TYPE content_count gauge",
+        "content_count 500",
+        *(f'content_count{{content_type="type-{i}"}} {i}' for i in range(20)),
+        *(f'content_count{{runtime_language="Python",runtime_version="3.{i}.0"}} {i}' for i in range(10)),
+        *(f'content_count{{access_type="{a}"}} 100' for a in ["acl", "all", "logged_in"]),
+        "# TYPE integrations_count gauge",
+        *(
+            f'integrations_count{{integration_template="t{i}",integration_auth_type="Viewer"}} {i}'
+            for i in range(10)
+        ),
+        "# TYPE application_count gauge",
+        "application_count 12",
+        *(f'application_count{{application_type="type-{i}"}} {i}' for i in range(5)),
+        "# TYPE schedule_count gauge",
+        *(f'schedule_count{{schedule_status="{s}"}} 3' for s in ["active", "paused"]),
+        "# TYPE process_count gauge",
+        *(f'process_count{{process_tag="tag-{i}"}} {i}' for i in range(5)),
+    ]
+
+    buckets = ["0.005", "0.01", "0.025", "0.05", "0.1", "0.25", "0.5", "1", "2.5", "5", "10", "+Inf"]
+    written = 0
+    family = 0
+    while written < series:
+        if family % 2:
+            lines.append(f"# HELP go_runtime_{family} A Go runtime gauge")
+            lines.append(f"# TYPE go_runtime_{family} gauge")
+            for i in range(50):
+                lines.append(f'go_runtime_{family}{{class="c{i}"}} {i * 1.5e3}')
+            written += 50
+        else:
+            name = f"http_request_duration_seconds_{family}"
+            lines.append(f"# HELP {name} Request latency")
+            lines.append(f"# TYPE {name} histogram")
+            for path in range(5):
+                labels = f'method="GET",path="/api/route/{path}",status="200"'
+                for i, le in enumerate(buckets):
+                    lines.append(f'{name}_bucket{{{labels},le="{le}"}} {i * 10}')
+                lines.append(f"{name}_sum{{{labels}}} 12.5")
+                lines.append(f"{name}_count{{{labels}}} 110")
+            written += 5 * (len(buckets) + 2)
+        family += 1
+    return ("\n".join(lines) + "\n").encode()
+
+
+def make_response(body: bytes) -> requests.Response:
+    """A response whose body is read from memory, as it would be off the wire"""
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = BytesIO(body)
+    return response
+
+
+def prometheus_client_parser(response: requests.Response) -> dict:
+    text_fd = TextIOWrapper(BytesIO(response.content), encoding="utf-8")
+    metrics = {}
+    for family in prometheus_parser.text_fd_to_metric_families(text_fd):
+        metrics[family.name] = [(sample.labels, sample.value) for sample in family.samples]
+    return metrics
+
+
+def streaming_parser(response: requests.Response) -> dict:
+    return app.parse_prometheus_lines(
+        response.iter_lines(chunk_size=65536), app.DASHBOARD_FAMILIES
+    )
+
+
+def measure(parse, body: bytes, repeat: int) -> tuple[float, int]:
+    """Median parse time in milliseconds, and peak memory allocated in bytes"""
+    timings = []
+    for _ in range(repeat):
+        response = make_response(body)
+        start = time.perf_counter()
+        parse(response)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    response = make_response(body)
+    tracemalloc.start()
+    parse(response)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--series", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'series':>7} {'body KiB':>9}  {'parser':<18} {'median ms':>10} {'peak KiB':>10}")
+    for series in args.series:
+        body = make_exposition(series)
+        # Both parsers must agree on the families the dashboard shows
+        everything = prometheus_client_parser(make_response(body))
+        wanted = {name: everything[name] for name in app.DASHBOARD_FAMILIES}
+        assert streaming_parser(make_response(body)) == wanted
+
+        results = {
+            "prometheus_client": measure(prometheus_client_parser, body, args.repeat),
+            "streaming": measure(streaming_parser, body, args.repeat),
+        }
+        for name, (ms, peak) in results.items():
+            print(f"{series:>7} {len(body) / 1024:>9.0f}  {name:<18} {ms:>10.2f} {peak / 1024:>10.0f}")
+        client_ms, client_peak = results["prometheus_client"]
+        streaming_ms, streaming_peak = results["streaming"]
+        print(
+            f"{'':>7} {'':>9}  {'improvement':<18} {client_ms / streaming_ms:>9.1f}x"
+            f" {client_peak / streaming_peak:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
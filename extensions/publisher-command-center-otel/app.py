@@ -1,18 +1,43 @@
 from http import client
 import asyncio
-from fastapi import FastAPI, Header, Body
+import base64
+import contextvars
+import functools
+import gzip
+import hashlib
+import json
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, make_dataclass
+from datetime import datetime, timezone
+from fastapi import FastAPI, Header, Body, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from posit import connect
 from posit.connect.errors import ClientError
+import brotli
+import orjson
 import os
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry import trace
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
 from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from requests.adapters import HTTPAdapter
+from starlette.datastructures import Headers, MutableHeaders
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
 
-from cachetools import TTLCache, cached
+from cachetools import TLRUCache, TTLCache, cached
+from cachetools.keys import hashkey
 
 # Initialize OpenTelemetry
 # Collect all CONNECT_* environment variables
@@ -34,15 +59,755 @@ span_processor = BatchSpanProcessor(OTLPSpanExporter())
 tracer_provider.add_span_processor(span_processor)
 trace.set_tracer_provider(tracer_provider)
 
+metric_reader = PeriodicExportingMetricReader(OTLPMetricExporter())
+meter_provider = MeterProvider(resource=resource, metric_readers=[metric_reader])
+metrics.set_meter_provider(meter_provider)
+
 client = connect.Client()
 
-app = FastAPI()
 
-# Create cache with TTL=1hour and unlimited size
-client_cache = TTLCache(maxsize=float("inf"), ttl=3600)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the usage store compaction, and the inventory pre-warmer when it is
+    enabled, alongside the app
+    """
+    tasks = [asyncio.create_task(compact_usage_store())]
+    if PREWARM_ENABLED:
+        tasks.append(asyncio.create_task(prewarm_inventories()))
+    yield
+    for task in [*tasks, *detached_tasks]:
+        task.cancel()
+    usage_store.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Get tracer for creating custom spans
 tracer = trace.get_tracer(__name__)
+# Get meter for recording custom metrics
+meter = metrics.get_meter(__name__)
+
+# Visitor clients are kept for up to an hour, and at most this many at once
+VISITOR_CLIENT_CACHE_SIZE = int(os.getenv("VISITOR_CLIENT_CACHE_SIZE", "256"))
+
+# Every client shares one keep-alive pool of at most CONNECT_POOL_SIZE
+# connections to Connect. The visitor's API key is still sent per request by
+# each client's own session auth.
+CONNECT_POOL_SIZE = int(os.getenv("CONNECT_POOL_SIZE", "32"))
+
+
+class TimedPoolMixin:
+    """Record connection pool wait time and utilisation on the current span"""
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        span = trace.get_current_span()
+        span.set_attribute("http.pool.wait_ms", (time.perf_counter() - start) * 1000)
+        span.set_attribute("http.pool.size", self.pool.maxsize)
+        span.set_attribute("http.pool.in_use", self.pool.maxsize - self.pool.qsize())
+        return conn
+
+
+class TimedHTTPConnectionPool(TimedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class TimedHTTPSConnectionPool(TimedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+# Every call to Connect goes through the shared adapter below, which records
+# its latency by endpoint and counts it against the inbound request it was
+# made for. Ids in the path are replaced so each endpoint is one series.
+CONNECT_PATH_IDS = re.compile(
+    r"/(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)(?=/|$)"
+)
+CONNECT_JOB_KEYS = re.compile(r"(/jobs/)[^/]+")
+
+connect_request_duration = meter.create_histogram(
+    "connect.request.duration",
+    unit="ms",
+    description="Time taken by calls to the Connect API, by endpoint and status",
+)
+connect_requests_in_flight = meter.create_up_down_counter(
+    "connect.requests.in_flight",
+    description="Calls to the Connect API currently waiting on a response",
+)
+connect_requests_per_request = meter.create_histogram(
+    "connect.requests.per_request",
+    description="Calls to the Connect API made to answer one inbound request, "
+    "by route",
+)
+
+# The number of Connect calls made so far for the inbound request being
+# handled, as a one-item list so calls made on other threads add to it
+upstream_calls: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar(
+    "upstream_calls", default=None
+)
+
+
+def connect_endpoint(path: str) -> str:
+    """A Connect API path with its guids, ids and job keys replaced"""
+    path = path.partition("?")[0].removeprefix("/__api__")
+    path = CONNECT_PATH_IDS.sub("/{id}", path)
+    return CONNECT_JOB_KEYS.sub(r"\1{key}", path)
+
+
+class SharedPoolAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools report their wait time and usage, and
+    which records the latency of each call sent through it
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        attributes = {
+            "http.request.method": request.method,
+            "connect.endpoint": connect_endpoint(request.path_url),
+        }
+        calls = upstream_calls.get()
+        if calls is not None:
+            calls[0] += 1
+
+        connect_requests_in_flight.add(1, attributes)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().send(request, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            connect_requests_in_flight.add(-1, attributes)
+            connect_request_duration.record(
+                (time.perf_counter() - start) * 1000,
+                {**attributes, "http.response.status_code": status},
+            )
+
+
+connect_adapter = SharedPoolAdapter(
+    pool_connections=1, pool_maxsize=CONNECT_POOL_SIZE, pool_block=True
+)
+client.session.mount(client.cfg.url, connect_adapter)
+
+client_cache_evictions = meter.create_counter(
+    "visitor_client_cache.evictions",
+    description="Visitor clients removed from the cache and closed",
+)
+
+
+class VisitorClientCache(TTLCache):
+    """
+    TTLCache that closes a visitor client's HTTP session when it is dropped,
+    along with the visitor's cached responses. posit-sdk resources only hold
+    a weak reference to their client, so a cached content item would stop
+    working once the client it was read with is gone.
+    """
+
+    def popitem(self):
+        key, visitor = super().popitem()
+        self._close(key, visitor, "capacity")
+        return key, visitor
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for key, visitor in expired:
+            self._close(key, visitor, "expired")
+        return expired
+
+    def _close(self, key, visitor, reason: str):
+        client_cache_evictions.add(1, {"reason": reason})
+        # The shared client is cached for requests without a token; keep it open
+        if visitor is not client:
+            (token,) = key
+            drop_visitor_responses(token)
+            # Detach the shared pool first so closing the session leaves it open
+            visitor.session.adapters.pop(client.cfg.url, None)
+            visitor.session.close()
+
+
+client_cache = VisitorClientCache(maxsize=VISITOR_CLIENT_CACHE_SIZE, ttl=3600)
+client_cache_lock = threading.Lock()
+
+meter.create_observable_gauge(
+    "visitor_client_cache.size",
+    callbacks=[
+        lambda options: [metrics.Observation(len(client_cache))],
+    ],
+    description="Visitor clients currently cached",
+)
+
+# The posit-sdk client is synchronous, so every call to Connect is run on this
+# pool to keep the event loop free for other requests
+SDK_EXECUTOR_WORKERS = int(os.getenv("SDK_EXECUTOR_WORKERS", "32"))
+sdk_executor = ThreadPoolExecutor(
+    max_workers=SDK_EXECUTOR_WORKERS, thread_name_prefix="connect-sdk"
+)
+# Calls waiting for a worker and calls currently running on one
+sdk_executor_stats = {"queued": 0, "running": 0}
+sdk_executor_lock = threading.Lock()
+
+meter.create_observable_gauge(
+    "sdk_executor.calls",
+    callbacks=[
+        lambda options: [
+            metrics.Observation(count, {"state": state})
+            for state, count in sdk_executor_stats.items()
+        ],
+    ],
+    description="posit-sdk calls waiting for a worker and running on one",
+)
+
+# Maximum number of active job lookups run at once when listing content
+ACTIVE_JOBS_CONCURRENCY = int(os.getenv("ACTIVE_JOBS_CONCURRENCY", "16"))
+
+# How long to wait for a destroyed process to exit, and the bounds of the
+# exponential backoff between checks
+TERMINATION_TIMEOUT = float(os.getenv("TERMINATION_TIMEOUT", "30"))
+TERMINATION_POLL_INITIAL = 0.25
+TERMINATION_POLL_MAX = 4.0
+
+# Connect responses cached per visitor, keyed by (token, endpoint, content
+# guid). Each endpoint has its own TTL and the least recently used entries are
+# dropped once the cache is full.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTLS = {
+    endpoint: float(os.getenv(f"RESPONSE_CACHE_TTL_{endpoint.upper()}", default))
+    for endpoint, default in {
+        "contents": 30,
+        "content": 30,
+        "owner": 300,
+        "bundles": 60,
+        "me": 300,
+    }.items()
+}
+response_cache = TLRUCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttu=lambda key, value, now: now + RESPONSE_CACHE_TTLS[key[1]],
+)
+response_cache_lock = threading.Lock()
+# Returned by the response cache for keys it doesn't hold, as None is a value
+# a read can cache
+CACHE_MISS = object()
+response_cache_reads = meter.create_counter(
+    "response_cache.reads",
+    description="Reads of the response cache, by endpoint and whether they hit",
+)
+
+# Usage metrics are counted into fixed-width time buckets aligned to a Monday
+# midnight UTC, so that day and week buckets start on calendar boundaries.
+USAGE_BUCKETS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+USAGE_BUCKET_ORIGIN = datetime(1970, 1, 5, tzinfo=timezone.utc).timestamp()
+USAGE_MAX_BUCKETS = 2000
+USAGE_DEFAULT_RANGE = 30 * 86400
+
+# Usage events are kept in a local SQLite file so each content item's history
+# is only downloaded once. The most recent USAGE_REFRESH_WINDOW seconds are
+# fetched again on every request, since Connect can record events late, and
+# events older than USAGE_RETENTION_DAYS are dropped by a periodic compaction.
+USAGE_STORE_PATH = os.getenv("USAGE_STORE_PATH", "usage.sqlite3")
+USAGE_REFRESH_WINDOW = float(os.getenv("USAGE_REFRESH_WINDOW", "3600"))
+USAGE_RETENTION = float(os.getenv("USAGE_RETENTION_DAYS", "400")) * 86400
+USAGE_COMPACT_INTERVAL = float(os.getenv("USAGE_COMPACT_INTERVAL", "86400"))
+
+class UsageStore:
+    """
+    Local copy of Connect's usage events, one row per event.
+
+    Events are kept separately for each visitor, by user guid, since Connect
+    only returns the usage a visitor is allowed to see. For each visitor and
+    content item the store also records the time range it holds every event
+    for. Fetched events replace whatever was stored for their range, so
+    overlapping fetches never store an event twice.
+    """
+
+    # Bumped whenever the tables change; older tables are dropped, as the
+    # store only holds what can be downloaded again
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            (version,) = self._db.execute("PRAGMA user_version").fetchone()
+            if version < self.SCHEMA_VERSION:
+                self._db.execute("DROP TABLE IF EXISTS usage_events")
+                self._db.execute("DROP TABLE IF EXISTS usage_coverage")
+                self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS usage_events ("
+                "visitor_guid TEXT NOT NULL, content_guid TEXT NOT NULL, "
+                "started REAL NOT NULL, user_guid TEXT)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS usage_events_visitor_content_started "
+                "ON usage_events (visitor_guid, content_guid, started)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS usage_coverage ("
+                "visitor_guid TEXT NOT NULL, content_guid TEXT NOT NULL, "
+                "since REAL NOT NULL, until REAL NOT NULL, "
+                "PRIMARY KEY (visitor_guid, content_guid))"
+            )
+
+    def coverage(self, visitor_guid: str, content_guid: str) -> tuple[float, float] | None:
+        """The (since, until) range the store holds every event for"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT since, until FROM usage_coverage "
+                "WHERE visitor_guid = ? AND content_guid = ?",
+                (visitor_guid, content_guid),
+            ).fetchone()
+
+    def replace(
+        self, visitor_guid: str, content_guid: str, since: float, until: float, events
+    ):
+        """
+        Store `events`, (started, user_guid) pairs, as every event the visitor
+        can see between `since` and `until`. The range must touch the existing
+        coverage.
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM usage_events WHERE visitor_guid = ? AND content_guid = ? "
+                "AND started >= ? AND started < ?",
+                (visitor_guid, content_guid, since, until),
+            )
+            self._db.executemany(
+                "INSERT INTO usage_events (visitor_guid, content_guid, started, user_guid) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    (visitor_guid, content_guid, started, user_guid)
+                    for started, user_guid in events
+                ),
+            )
+            self._db.execute(
+                "INSERT INTO usage_coverage (visitor_guid, content_guid, since, until) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT (visitor_guid, content_guid) DO UPDATE SET "
+                "since = MIN(since, excluded.since), until = MAX(until, excluded.until)",
+                (visitor_guid, content_guid, since, until),
+            )
+
+    def counts(
+        self, visitor_guid: str, content_guid: str, since: float, until: float, width: int
+    ) -> dict[int, int]:
+        """Number of events per bucket index between `since` and `until`"""
+        with self._lock:
+            return dict(
+                self._db.execute(
+                    "SELECT CAST((started - ?) / ? AS INTEGER) AS bucket, COUNT(*) "
+                    "FROM usage_events WHERE visitor_guid = ? AND content_guid = ? "
+                    "AND started >= ? AND started < ? "
+                    "GROUP BY bucket",
+                    (USAGE_BUCKET_ORIGIN, width, visitor_guid, content_guid, since, until),
+                )
+            )
+
+    def forget(self, content_guid: str):
+        """Drop every visitor's events for a content item"""
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM usage_events WHERE content_guid = ?", (content_guid,)
+            )
+            self._db.execute(
+                "DELETE FROM usage_coverage WHERE content_guid = ?", (content_guid,)
+            )
+
+    def compact(self, cutoff: float) -> int:
+        """
+        Drop the events that started before `cutoff` and reclaim their space.
+        Returns the number of events dropped.
+        """
+        with self._lock:
+            with self._db:
+                deleted = self._db.execute(
+                    "DELETE FROM usage_events WHERE started < ?", (cutoff,)
+                ).rowcount
+                self._db.execute(
+                    "DELETE FROM usage_coverage WHERE until < ?", (cutoff,)
+                )
+                self._db.execute(
+                    "UPDATE usage_coverage SET since = ? WHERE since < ?",
+                    (cutoff, cutoff),
+                )
+            if deleted:
+                self._db.execute("VACUUM")
+            return deleted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+usage_store = UsageStore(USAGE_STORE_PATH)
+
+# Reads currently waiting on Connect. Concurrent identical reads, from any
+# number of visitors' requests, join the one in flight instead of sending
+# their own call.
+inflight_reads: dict[tuple, asyncio.Future] = {}
+singleflight_reads = meter.create_counter(
+    "singleflight.reads",
+    description="Reads that missed the cache, by endpoint and whether they "
+    "joined a read already in flight",
+)
+meter.create_observable_gauge(
+    "singleflight.in_flight",
+    callbacks=[
+        lambda options: [metrics.Observation(len(inflight_reads))],
+    ],
+    description="Distinct reads currently waiting on Connect",
+)
+
+# Responses smaller than this many bytes aren't worth compressing
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+# In order of preference
+COMPRESSORS = {
+    "br": lambda body: brotli.compress(body, quality=4),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+PRECOMPRESSED_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+# Paging limits and sortable fields for the content listing
+CONTENTS_PAGE_SIZE = 50
+CONTENTS_MAX_PAGE_SIZE = 500
+CONTENTS_SORT_FIELDS = {"title", "name", "last_deployed_time", "created_time"}
+
+# Fields a content item can be projected to with `fields=`. `active_jobs` is
+# only known to the listing, which looks them up when asked for.
+CONTENT_FIELDS = (
+    "guid", "name", "title", "description", "access_type", "locked",
+    "locked_message", "connection_timeout", "read_timeout", "init_timeout",
+    "idle_timeout", "max_processes", "min_processes", "max_conns_per_process",
+    "load_factor", "cpu_request", "cpu_limit", "memory_request", "memory_limit",
+    "amd_gpu_limit", "nvidia_gpu_limit", "content_category", "parameterized",
+    "cluster_name", "image_name", "default_image_name",
+    "default_r_environment_management", "default_py_environment_management",
+    "service_account_name", "r_version", "r_environment_management",
+    "py_version", "py_environment_management", "quarto_version", "run_as",
+    "run_as_current_user", "created_time", "last_deployed_time", "bundle_id",
+    "app_mode", "content_url", "dashboard_url", "app_role", "vanity_url", "tags",
+    "owner", "owner_guid", "id", "extension",
+)
+# The fields the listing sends when none are asked for: what the Home table
+# renders
+CONTENTS_DEFAULT_FIELDS = (
+    "guid", "title", "app_mode", "content_category", "r_version", "py_version",
+    "quarto_version", "locked", "last_deployed_time", "created_time",
+    "content_url", "active_jobs",
+)
+
+# Optional background refresh of the content inventory of recently active
+# visitors, so /api/contents can answer from a snapshot instead of crawling
+# Connect on every visit
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "false").lower() == "true"
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "60"))
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+PREWARM_MAX_VISITORS = int(os.getenv("PREWARM_MAX_VISITORS", "50"))
+PREWARM_ACTIVE_WINDOW = float(os.getenv("PREWARM_ACTIVE_WINDOW", "900"))
+
+# Visitors seen within the active window, and their inventory snapshots
+active_visitors = TTLCache(maxsize=PREWARM_MAX_VISITORS, ttl=PREWARM_ACTIVE_WINDOW)
+inventory_snapshots = TTLCache(
+    maxsize=PREWARM_MAX_VISITORS, ttl=PREWARM_ACTIVE_WINDOW + PREWARM_INTERVAL
+)
+prewarm_lock = threading.Lock()
+prewarm_semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+# Operations accepted by the bulk endpoint, and how many items it works on
+# at once
+BULK_OPERATIONS = {"lock", "unlock", "delete", "kill"}
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))
+
+# Process terminations this process is watching or recently watched, keyed
+# by tracking id. The id also names the content item, the process and when it
+# was stopped, so any app process can answer for it from Connect.
+terminations = TTLCache(maxsize=1024, ttl=600)
+
+# Work started by a request that outlives it, kept here until it finishes
+detached_tasks = set()
+
+
+def run_detached(coro):
+    """
+    Run `coro` as a task of its own, in a fresh context, so it neither keeps
+    the request that started it open nor is counted as part of it.
+    """
+    task = asyncio.create_task(coro, context=contextvars.Context())
+    detached_tasks.add(task)
+    task.add_done_callback(detached_tasks.discard)
+
+
+async def run_sdk(func, /, *args, **kwargs):
+    """
+    Run a blocking posit-sdk call on `sdk_executor` and await its result.
+
+    Each call gets a span recording how many calls were queued and running
+    when it was submitted and how long it waited for a worker.
+    """
+    loop = asyncio.get_running_loop()
+    name = getattr(func, "__qualname__", type(func).__name__)
+
+    with tracer.start_as_current_span("connect_sdk_call") as span:
+        span.set_attribute("sdk.call", name)
+        span.set_attribute("executor.max_workers", SDK_EXECUTOR_WORKERS)
+        with sdk_executor_lock:
+            sdk_executor_stats["queued"] += 1
+            span.set_attribute("executor.queue_depth", sdk_executor_stats["queued"])
+            span.set_attribute("executor.running", sdk_executor_stats["running"])
+        submitted = time.perf_counter()
+
+        def call():
+            with sdk_executor_lock:
+                sdk_executor_stats["queued"] -= 1
+                sdk_executor_stats["running"] += 1
+            span.set_attribute("executor.wait_ms", (time.perf_counter() - submitted) * 1000)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with sdk_executor_lock:
+                    sdk_executor_stats["running"] -= 1
+
+        # Copy the context so spans created in the worker share this trace
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(sdk_executor, ctx.run, call)
+
+
+def if_none_match(header: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches `etag`, ignoring weakness"""
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def body_etag(body: bytes) -> str:
+    """The strong ETag of a response body"""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    """
+    Tag JSON API responses with a strong ETag hashed from the body, and answer
+    a GET whose If-None-Match already has that version with a 304 and no body.
+    Responses are per visitor, so they may only be cached by the browser, and
+    must be revalidated before reuse.
+    """
+    response = await call_next(request)
+    if (
+        request.method != "GET"
+        or response.status_code != 200
+        or not request.url.path.startswith("/api/")
+        or response.headers.get("content-type") != "application/json"
+    ):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    etag = body_etag(body)
+    headers = {
+        **response.headers,
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+    }
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        headers.pop("content-length", None)
+        headers.pop("content-type", None)
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+def accepted_encodings(header: str | None) -> dict[str, float]:
+    """The quality an Accept-Encoding header gives each content coding it names"""
+    qualities = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        try:
+            q = float(params.strip().removeprefix("q=")) if params.strip() else 1.0
+        except ValueError:
+            continue
+        qualities[coding.strip().lower()] = q
+    return qualities
+
+
+def preferred_encoding(header: str | None, available) -> str | None:
+    """
+    The first of `available` content codings the client accepts. A coding
+    the client names with q=0 is refused even when it also sends "*".
+    """
+    qualities = accepted_encodings(header)
+    return next(
+        (e for e in available if qualities.get(e, qualities.get("*", 0)) > 0), None
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least `minimum_size` bytes with brotli or gzip,
+    preferring brotli. Only responses sent in a single body are compressed:
+    streams such as the NDJSON listing are passed through so their lines
+    aren't held back, and files are served precompressed by StaticFiles.
+    """
+
+    def __init__(self, app, minimum_size: int):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        encoding = None
+        if scope["type"] == "http":
+            encoding = preferred_encoding(
+                Headers(scope=scope).get("accept-encoding"), COMPRESSORS
+            )
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether to compress
+                start = message
+                return
+            if start is None:
+                return await send(message)
+
+            response_start, start = start, None
+            headers = MutableHeaders(scope=response_start)
+            body = message.get("body", b"")
+            if (
+                message.get("more_body")
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(response_start)
+                return await send(message)
+
+            body = COMPRESSORS[encoding](body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            # The compressed bytes differ, so the tag only matches weakly now
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(response_start)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that sends the `.br` or `.gz` variant written next to a file
+    at build time when the client accepts it. Vite puts a hash of each
+    asset's content in its name, so those may be cached for good; anything
+    else, like index.html, is revalidated on every use.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+
+        relative_path = os.path.relpath(full_path, self.directory)
+        if relative_path.startswith("assets" + os.sep):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+
+        variants = {
+            encoding: full_path + extension
+            for encoding, extension in PRECOMPRESSED_EXTENSIONS.items()
+            if os.path.isfile(full_path + extension)
+        }
+        if not variants:
+            return response
+        response.headers.add_vary_header("Accept-Encoding")
+
+        encoding = preferred_encoding(Headers(scope=scope).get("accept-encoding"), variants)
+        if response.status_code != 200 or encoding is None:
+            return response
+
+        headers = {
+            key: value
+            for key, value in response.headers.items()
+            if key not in ("content-length", "content-type")
+        }
+        # Keep the original file's tag, so conditional requests still match it
+        headers["etag"] = f"W/{headers['etag']}"
+        headers["content-encoding"] = encoding
+        return FileResponse(
+            variants[encoding],
+            status_code=status_code,
+            headers=headers,
+            media_type=response.media_type,
+        )
+
+
+class UpstreamCallsMiddleware:
+    """
+    Count the Connect API calls made while answering each API request,
+    including those made while a streamed body is sent. The count is taken
+    when the last of the body is sent, so calls made after the response, by
+    background tasks, aren't counted against the request. Reads that join
+    one already in flight for another request cost nothing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        calls = [0]
+        recorded = False
+
+        def record():
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            connect_requests_per_request.record(
+                calls[0],
+                {
+                    "http.request.method": scope["method"],
+                    "http.route": route.path if route else "unmatched",
+                },
+            )
+
+        async def counting_send(message):
+            # The request's span ends once the last of the body is sent
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                trace.get_current_span().set_attribute("connect.requests", calls[0])
+                record()
+            await send(message)
+
+        token = upstream_calls.set(calls)
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            upstream_calls.reset(token)
+            # The request failed before its response was sent
+            if not recorded:
+                record()
+
+
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+app.add_middleware(UpstreamCallsMiddleware)
 
 
 @app.get("/api/visitor-auth")
@@ -56,7 +821,7 @@ async def integration_status(posit_connect_user_session_token: str = Header(None
         if not posit_connect_user_session_token:
             return {"authorized": False}
         try:
-            get_visitor_client(posit_connect_user_session_token)
+            await run_sdk(get_visitor_client, posit_connect_user_session_token)
         except ClientError as err:
             if err.error_code == 212:
                 return {"authorized": False}
@@ -69,8 +834,8 @@ async def integration_status(posit_connect_user_session_token: str = Header(None
 async def set_integration(integration_guid: str = Body(..., embed=True)):
     if os.getenv("RSTUDIO_PRODUCT") == "CONNECT":
         content_guid = os.getenv("CONNECT_CONTENT_GUID")
-        content = client.content.get(content_guid)
-        content.oauth.associations.update(integration_guid)
+        content = await run_sdk(client.content.get, content_guid)
+        await run_sdk(content.oauth.associations.update, integration_guid)
     else:
         # Raise an error if not running on Connect
         raise ClientError(
@@ -82,7 +847,7 @@ async def set_integration(integration_guid: str = Body(..., embed=True)):
 
 @app.get("/api/integrations")
 async def get_integrations():
-    integrations = client.oauth.integrations.find()
+    integrations = await run_sdk(client.oauth.integrations.find)
     admin_integrations = [
         i
         for i in integrations
@@ -97,49 +862,520 @@ async def get_integrations():
     return eligible_integrations[0] if eligible_integrations else None
 
 
-@cached(client_cache)
 def get_visitor_client(token: str | None) -> connect.Client:
+    """Return the visitor's API client, noting them as active for the pre-warmer"""
+    if PREWARM_ENABLED:
+        with prewarm_lock:
+            active_visitors[token] = time.time()
+    return create_visitor_client(token)
+
+
+@cached(client_cache, lock=client_cache_lock)
+def create_visitor_client(token: str | None) -> connect.Client:
     """Create and cache API client per token with 1 hour TTL"""
     if token:
-        return client.with_user_session_token(token)
+        visitor = client.with_user_session_token(token)
+        visitor.session.mount(client.cfg.url, connect_adapter)
+        return visitor
     else:
         return client
 
 
+async def cached_read(
+    token: str | None, endpoint: str, content_guid: str, func, /, *args, **kwargs
+):
+    """
+    Return the cached response for this visitor's read of `endpoint` on a
+    content item, calling `func` through `run_sdk` on a miss.
+    """
+    key = (token, endpoint, content_guid)
+    span = trace.get_current_span()
+
+    with response_cache_lock:
+        value = response_cache.get(key, CACHE_MISS)
+    hit = value is not CACHE_MISS
+    response_cache_reads.add(1, {"endpoint": endpoint, "hit": hit})
+    span.set_attribute(f"cache.{endpoint}.hit", hit)
+    if hit:
+        return value
+
+    async def load():
+        value = await run_sdk(func, *args, **kwargs)
+        # A write may have invalidated this read while it was in flight, or
+        # the visitor's client, which the value refers to, may have been closed
+        if (
+            inflight_reads.get(key) is asyncio.current_task()
+            and visitor_client_cached(token)
+        ):
+            with response_cache_lock:
+                response_cache[key] = value
+        return value
+
+    return await single_flight(key, endpoint, load)
+
+
+async def single_flight(key: tuple, endpoint: str, func, /):
+    """
+    Await `func()`, unless a call with the same key is already in flight, in
+    which case wait for its result instead.
+    """
+    task = inflight_reads.get(key)
+    coalesced = task is not None
+    trace.get_current_span().set_attribute(f"singleflight.{endpoint}.coalesced", coalesced)
+    singleflight_reads.add(1, {"endpoint": endpoint, "coalesced": coalesced})
+
+    if task is None:
+        task = asyncio.ensure_future(func())
+        inflight_reads[key] = task
+
+        def done(task):
+            if inflight_reads.get(key) is task:
+                del inflight_reads[key]
+
+        task.add_done_callback(done)
+
+    # Shielded so one caller going away doesn't cancel the read for the others
+    return await asyncio.shield(task)
+
+
+def drop_visitor_responses(token: str | None):
+    """Drop a visitor's cached responses, once their client has been closed"""
+    with response_cache_lock:
+        for key in [k for k in response_cache.keys() if k[0] == token]:
+            response_cache.pop(key, None)
+
+
+def visitor_client_cached(token: str | None) -> bool:
+    """Whether the client that reads on behalf of `token` is still cached"""
+    with client_cache_lock:
+        return hashkey(token) in client_cache
+
+
+def invalidate_content(content_guid: str):
+    """
+    Drop every visitor's cached responses for a content item, along with the
+    cached content listings that include it. Reads of them already in flight
+    are left to finish, but new reads no longer join them.
+    """
+    with response_cache_lock:
+        for key in [
+            k for k in response_cache.keys()
+            if k[2] == content_guid or k[1] == "contents"
+        ]:
+            response_cache.pop(key, None)
+    for key in [
+        k for k in inflight_reads if k[2] == content_guid or k[1] == "contents"
+    ]:
+        del inflight_reads[key]
+
+
+async def get_content(visitor, token: str | None, content_id: str):
+    """Fetch a content item as the visitor, using the response cache"""
+    return await cached_read(token, "content", content_id, visitor.content.get, content_id)
+
+
+def get_active_jobs(content) -> list:
+    """Return the jobs of a content item that are still running"""
+    return [job for job in content.jobs if job["status"] == 0]
+
+
+def get_owner(content) -> dict:
+    """Return the owner of a content item, fetching it if not included"""
+    return content.owner
+
+
+async def iter_active_jobs(contents: list):
+    """
+    Attach `active_jobs` to every content item, running at most
+    `ACTIVE_JOBS_CONCURRENCY` lookups at once. Yields the index of each item
+    and the latency of its lookup in seconds as soon as the lookup finishes.
+    """
+    semaphore = asyncio.Semaphore(ACTIVE_JOBS_CONCURRENCY)
+
+    async def timed_lookup(index, content):
+        async with semaphore:
+            start = time.perf_counter()
+            content["active_jobs"] = await run_sdk(get_active_jobs, content)
+            return index, time.perf_counter() - start
+
+    for lookup in asyncio.as_completed(
+        [timed_lookup(i, c) for i, c in enumerate(contents)]
+    ):
+        yield await lookup
+
+
+async def fetch_active_jobs(contents: list) -> list[float]:
+    """
+    Attach `active_jobs` to every content item. Returns the latency of each
+    lookup in seconds.
+    """
+    return [latency async for _, latency in iter_active_jobs(contents)]
+
+
+def record_fanout(span, width: int, latencies: list[float]):
+    """Record the width and per-item latency of an active jobs fan-out"""
+    span.set_attribute("fanout.width", width)
+    span.set_attribute("fanout.concurrency", ACTIVE_JOBS_CONCURRENCY)
+    if latencies:
+        latencies_ms = sorted(l * 1000 for l in latencies)
+        span.set_attribute("fanout.item_latency_ms.mean", statistics.fmean(latencies_ms))
+        span.set_attribute("fanout.item_latency_ms.p50", latencies_ms[len(latencies_ms) // 2])
+        span.set_attribute("fanout.item_latency_ms.p95", latencies_ms[int(len(latencies_ms) * 0.95)])
+        span.set_attribute("fanout.item_latency_ms.max", latencies_ms[-1])
+
+
+async def stream_page(page: list, fields: tuple[str, ...]):
+    """
+    Yield the content items on the page as NDJSON, for items that need no
+    lookups: those from a snapshot, or when active jobs weren't asked for
+    """
+    for index, content in enumerate(page):
+        record = project_content(content, fields)
+        yield orjson.dumps({"index": index, "content": record}) + b"\n"
+
+
+async def stream_contents(page: list, fields: tuple[str, ...]):
+    """
+    Yield each content item on the page as a line of NDJSON once its active
+    jobs are known. Lines arrive in completion order, so each one carries the
+    item's `index` on the page.
+    """
+    with tracer.start_as_current_span("stream_active_jobs") as span:
+        latencies = []
+        async for index, latency in iter_active_jobs(page):
+            latencies.append(latency)
+            record = project_content(page[index], fields)
+            yield orjson.dumps({"index": index, "content": record}) + b"\n"
+        record_fanout(span, len(page), latencies)
+
+
+async def stream_with_etag(lines, document):
+    """
+    Yield the NDJSON `lines`, then a last line with the ETag the same page
+    has when it isn't streamed. `document()` builds that page once every
+    line has been sent, so a client can revalidate what it streamed with
+    If-None-Match on the unstreamed listing.
+    """
+    async for line in lines:
+        yield line
+    yield orjson.dumps({"etag": body_etag(orjson.dumps(document()))}) + b"\n"
+
+
+def filter_owned_content(all_content: list) -> list:
+    return [c for c in all_content if c.app_role in ["owner", "editor"]]
+
+
+async def refresh_inventory(token: str | None):
+    """Rebuild a visitor's snapshot of owned content and their active jobs"""
+    with tracer.start_as_current_span("refresh_inventory") as span:
+        visitor = await run_sdk(create_visitor_client, token)
+        contents = filter_owned_content(await run_sdk(visitor.content.find))
+        latencies = await fetch_active_jobs(contents)
+        record_fanout(span, len(contents), latencies)
+
+    with prewarm_lock:
+        inventory_snapshots[token] = {"contents": contents, "refreshed_at": time.time()}
+
+
+async def prewarm_inventory(token: str | None):
+    """
+    Refresh one visitor's snapshot, sharing a refresh already in flight for
+    them and running at most PREWARM_CONCURRENCY refreshes at once.
+    """
+
+    async def refresh():
+        async with prewarm_semaphore:
+            try:
+                await refresh_inventory(token)
+            except ClientError:
+                # The visitor's session is no longer valid; stop tracking them
+                with prewarm_lock:
+                    active_visitors.pop(token, None)
+                    inventory_snapshots.pop(token, None)
+            except Exception:
+                # Already recorded on the span; try again next interval
+                pass
+
+    await single_flight((token, "inventory", ""), "inventory", refresh)
+
+
+async def prewarm_inventories():
+    """Refresh the snapshot of every recently active visitor on an interval"""
+    while True:
+        with prewarm_lock:
+            tokens = list(active_visitors.keys())
+        await asyncio.gather(*(prewarm_inventory(token) for token in tokens))
+        await asyncio.sleep(PREWARM_INTERVAL)
+
+
+def get_inventory_snapshot(token: str | None) -> dict | None:
+    with prewarm_lock:
+        return inventory_snapshots.get(token)
+
+
+def update_snapshots(content_guid: str, changes: dict | None):
+    """
+    Apply a change made through the app to every inventory snapshot holding
+    the content item, or remove the item when `changes` is None.
+    """
+    with prewarm_lock:
+        for snapshot in inventory_snapshots.values():
+            if changes is None:
+                snapshot["contents"] = [
+                    c for c in snapshot["contents"] if c["guid"] != content_guid
+                ]
+                continue
+            for c in snapshot["contents"]:
+                if c["guid"] == content_guid:
+                    # ContentItem.update would send the change to Connect
+                    dict.update(c, changes)
+
+
+@dataclass(slots=True)
+class JobRecord:
+    """The fields of a running process the content listing sends"""
+
+    key: str
+    pid: int | None
+    hostname: str | None
+    start_time: str | None
+
+    @classmethod
+    def from_job(cls, job) -> "JobRecord":
+        return cls(job["key"], job.get("pid"), job.get("hostname"), job.get("start_time"))
+
+
+@functools.lru_cache(maxsize=64)
+def content_record_type(fields: tuple[str, ...]) -> type:
+    """
+    A slotted record class holding just `fields` of a content item. The
+    listing sends these instead of the whole posit-sdk resource, which keeps
+    the payload small and lets orjson encode it without walking each item's
+    dict.
+    """
+    return make_dataclass("ContentRecord", fields, slots=True)
+
+
+def project_content(content, fields: tuple[str, ...]):
+    """Copy `fields` of a content item into a record"""
+    values = [content.get(field) for field in fields]
+    if "active_jobs" in fields:
+        index = fields.index("active_jobs")
+        if values[index] is not None:
+            values[index] = [JobRecord.from_job(job) for job in values[index]]
+    return content_record_type(fields)(*values)
+
+
+def parse_fields(fields: str | None, allowed, default) -> tuple[str, ...]:
+    """
+    Parse a comma-separated `fields` parameter, rejecting fields that are
+    not in `allowed`
+    """
+    if fields is None:
+        return default
+
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    if not requested:
+        raise HTTPException(status_code=400, detail="No fields requested")
+    return requested
+
+
+def orjson_response(content) -> Response:
+    """A JSON response encoded with orjson, which also handles dataclasses"""
+    return Response(orjson.dumps(content), media_type="application/json")
+
+
+def content_sort_key(field: str):
+    """
+    Build a sort key for content items on `field`, using the guid as a tie
+    breaker so the ordering, and therefore every cursor, is stable.
+    """
+    def key(content) -> tuple[str, str]:
+        value = content.get(field) or ""
+        if field in ("title", "name"):
+            value = value.lower()
+        return (value, content["guid"])
+
+    return key
+
+
+def encode_cursor(position: tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        value, guid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Sort keys are pairs of strings, and only compare with one another
+    if not isinstance(value, str) or not isinstance(guid, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return (value, guid)
+
+
+def paginate_contents(
+    contents: list,
+    page_size: int,
+    cursor: str | None,
+    sort: str,
+    search: str | None,
+) -> tuple[list, int, str | None]:
+    """
+    Filter, sort and slice the content listing. Returns the page, the total
+    number of items matching `search` and the cursor of the next page.
+    """
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in CONTENTS_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{field}'")
+
+    if search:
+        needle = search.lower()
+        contents = [
+            c for c in contents
+            if needle in (c.get("title") or "").lower()
+            or needle in (c.get("name") or "").lower()
+        ]
+
+    key = content_sort_key(field)
+    ordered = sorted(contents, key=key, reverse=descending)
+
+    if cursor:
+        position = decode_cursor(cursor)
+        if descending:
+            ordered = [c for c in ordered if key(c) < position]
+        else:
+            ordered = [c for c in ordered if key(c) > position]
+
+    page = ordered[:page_size]
+    next_cursor = encode_cursor(key(page[-1])) if len(ordered) > page_size else None
+    return page, len(contents), next_cursor
+
+
 @app.get("/api/contents")
-async def contents(posit_connect_user_session_token: str = Header(None)):
-    visitor = get_visitor_client(posit_connect_user_session_token)
+async def contents(
+    page_size: int = Query(CONTENTS_PAGE_SIZE, ge=1, le=CONTENTS_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "title",
+    search: str | None = None,
+    stream: bool = False,
+    fields: str | None = None,
+    posit_connect_user_session_token: str = Header(None),
+):
+    """
+    List one page of the content the visitor owns or collaborates on, in the
+    same `results` / `paging` shape Connect uses for its paginated endpoints.
+    `sort` is a field name, prefixed with `-` for descending order, and
+    `search` matches the title or name. Active jobs are only looked up for
+    the items on the requested page, and only if `active_jobs` is among the
+    comma-separated `fields` each item is projected to.
+
+    With `stream=true` the page is sent as NDJSON instead, one line per item
+    as soon as its active jobs are known, with the paging details in the
+    `X-Total-Count`, `X-Result-Count` and `X-Next-Cursor` headers. The last
+    line holds the `etag` the unstreamed page would be sent with.
+
+    When the pre-warmer is enabled and has a snapshot of the visitor's
+    inventory, the page is served from it and `snapshot` (or the
+    `X-Snapshot-Refreshed-At` header) says when it was taken.
+    """
+    fields = parse_fields(fields, CONTENT_FIELDS + ("active_jobs",), CONTENTS_DEFAULT_FIELDS)
+    needs_jobs = "active_jobs" in fields
 
-    with tracer.start_as_current_span("fetch_all_content"):
-        all_content = visitor.content.find()
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    snapshot = get_inventory_snapshot(posit_connect_user_session_token)
 
-    with tracer.start_as_current_span("filter_owned_content"):
-        contents = [c for c in all_content if c.app_role in ["owner", "editor"]]
+    if snapshot:
+        contents = snapshot["contents"]
+    else:
+        if PREWARM_ENABLED:
+            run_detached(prewarm_inventory(posit_connect_user_session_token))
+
+        with tracer.start_as_current_span("fetch_all_content"):
+            all_content = await cached_read(
+                posit_connect_user_session_token, "contents", "", visitor.content.find
+            )
+
+        with tracer.start_as_current_span("filter_owned_content"):
+            contents = filter_owned_content(all_content)
 
-    with tracer.start_as_current_span("fetch_active_jobs"):
-        for content in contents:
-            content["active_jobs"] = [job for job in content.jobs if job["status"] == 0]
+    with tracer.start_as_current_span("paginate_content") as span:
+        page, total, next_cursor = paginate_contents(
+            contents, page_size, cursor, sort, search
+        )
+        span.set_attribute("page.size", len(page))
+        span.set_attribute("page.total", total)
 
-    return contents
+    refreshed_at = None
+    if snapshot:
+        refreshed_at = datetime.fromtimestamp(
+            snapshot["refreshed_at"], tz=timezone.utc
+        ).isoformat()
+
+    def document():
+        return {
+            "results": [project_content(c, fields) for c in page],
+            "paging": {"total": total, "cursors": {"next": next_cursor}},
+            "snapshot": {"refreshed_at": refreshed_at} if snapshot else None,
+        }
+
+    if stream:
+        headers = {"X-Total-Count": str(total), "X-Result-Count": str(len(page))}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        if snapshot:
+            headers["X-Snapshot-Refreshed-At"] = refreshed_at
+        lines = (
+            stream_contents(page, fields)
+            if needs_jobs and not snapshot
+            else stream_page(page, fields)
+        )
+        return StreamingResponse(
+            stream_with_etag(lines, document),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+
+    if needs_jobs and not snapshot:
+        with tracer.start_as_current_span("fetch_active_jobs") as span:
+            latencies = await fetch_active_jobs(page)
+            record_fanout(span, len(page), latencies)
+
+    return orjson_response(document())
 
 
 @app.get("/api/contents/{content_id}")
 async def content(
-    content_id: str, posit_connect_user_session_token: str = Header(None)
+    content_id: str,
+    fields: str | None = None,
+    posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    return visitor.content.get(content_id)
+    """The content item, or just the comma-separated `fields` of it"""
+    projection = parse_fields(fields, CONTENT_FIELDS, None)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await get_content(visitor, posit_connect_user_session_token, content_id)
+    if projection is None:
+        return content
+    return orjson_response(project_content(content, projection))
 
 @app.patch("/api/content/{content_id}/lock")
 async def lock_content(
     content_id: str,
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    content = visitor.content.get(content_id)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await run_sdk(visitor.content.get, content_id)
     is_locked = content.locked
 
-    content.update(locked=not is_locked)
+    await run_sdk(content.update, locked=not is_locked)
+    invalidate_content(content_id)
+    update_snapshots(content_id, {"locked": content["locked"]})
     return content
 
 @app.patch("/api/content/{content_id}/rename")
@@ -148,23 +1384,23 @@ async def rename_content(
     title: str = Body(..., embed = True),
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    content = visitor.content.get(content_id)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await run_sdk(visitor.content.get, content_id)
 
-    content.update(title = title)
+    await run_sdk(content.update, title = title)
+    invalidate_content(content_id)
+    update_snapshots(content_id, {"title": content["title"]})
     return content
 
 @app.get("/api/contents/{content_id}/processes")
 async def get_content_processes(
     content_id: str, posit_connect_user_session_token: str = Header(None)
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
 
     # Assert the viewer has access to the content
-    content = visitor.content.get(content_id)
-    # make a list of the iterable:
-    active_jobs = [job for job in content.jobs if job["status"] == 0]
-    return active_jobs
+    content = await get_content(visitor, posit_connect_user_session_token, content_id)
+    return await run_sdk(get_active_jobs, content)
 
 
 @app.delete("/api/contents/{content_id}")
@@ -172,29 +1408,196 @@ async def delete_content(
     content_id: str,
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+
+    content = await run_sdk(visitor.content.get, content_id)
+    await run_sdk(content.delete)
+    invalidate_content(content_id)
+    update_snapshots(content_id, None)
+    await asyncio.to_thread(usage_store.forget, content_id)
+
+
+async def wait_for_termination(termination_id: str, content, process_id: str):
+    """
+    Poll a destroyed job until it stops running, backing off exponentially
+    between checks, and record the outcome on its termination entry.
+    """
+    termination = terminations[termination_id]
+    delay = TERMINATION_POLL_INITIAL
+    deadline = time.monotonic() + TERMINATION_TIMEOUT
+
+    with tracer.start_as_current_span("wait_for_termination") as span:
+        span.set_attribute("termination.id", termination_id)
+        polls = 0
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(delay)
+                polls += 1
+                job = await run_sdk(content.jobs.find, process_id)
+                if not job or job["status"] != 0:
+                    termination["status"] = "terminated"
+                    break
+                delay = min(delay * 2, TERMINATION_POLL_MAX)
+            else:
+                termination["status"] = "timeout"
+        except ClientError as err:
+            termination["status"] = "error"
+            termination["error"] = err.error_message
+        except Exception as err:
+            termination["status"] = "error"
+            termination["error"] = str(err)
+        finally:
+            span.set_attribute("termination.polls", polls)
+            span.set_attribute("termination.status", termination["status"])
+
 
-    content = visitor.content.get(content_id)
-    content.delete()
+def parse_termination_id(termination_id: str) -> tuple[str, str, int]:
+    """The content id, process id and stop time a termination id names"""
+    try:
+        content_id, process_id, stopped_at = termination_id.split(".")
+        return content_id, process_id, int(stopped_at)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Unknown termination id")
 
 
-@app.delete("/api/contents/{content_id}/processes/{process_id}")
+@app.delete("/api/contents/{content_id}/processes/{process_id}", status_code=202)
 async def destroy_process(
     content_id: str,
     process_id: str,
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
+    """
+    Ask Connect to destroy a process and return right away with a tracking
+    id. Poll `/api/terminations/{id}` to find out when the process has exited.
+    """
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+
+    content = await run_sdk(visitor.content.get, content_id)
+    job = await run_sdk(content.jobs.find, process_id)
 
-    content = visitor.content.get(content_id)
-    job = content.jobs.find(process_id)
+    termination_id = f"{content_id}.{process_id}.{int(time.time())}"
+    termination = {
+        "id": termination_id,
+        "content_id": content_id,
+        "process_id": process_id,
+        "status": "terminated",
+    }
+    terminations[termination_id] = termination
     if job:
-        job.destroy()
-        for _ in range(30):
-            job = content.jobs.find(process_id)
-            if job["status"] != 0:
-                return
-            await asyncio.sleep(1)
+        await run_sdk(job.destroy)
+        termination["status"] = "pending"
+        run_detached(wait_for_termination(termination_id, content, process_id))
+
+    return termination
+
+
+@app.get("/api/terminations/{termination_id}")
+async def get_termination(
+    termination_id: str,
+    posit_connect_user_session_token: str = Header(None),
+):
+    termination = terminations.get(termination_id)
+    if termination is not None:
+        return termination
+
+    # Stopped through another app process; check the job with Connect instead
+    content_id, process_id, stopped_at = parse_termination_id(termination_id)
+    termination = {
+        "id": termination_id,
+        "content_id": content_id,
+        "process_id": process_id,
+    }
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    try:
+        content = await run_sdk(visitor.content.get, content_id)
+        job = await run_sdk(content.jobs.find, process_id)
+    except ClientError as err:
+        return {**termination, "status": "error", "error": err.error_message}
+    if not job or job["status"] != 0:
+        return {**termination, "status": "terminated"}
+    if time.time() - stopped_at > TERMINATION_TIMEOUT:
+        return {**termination, "status": "timeout"}
+    return {**termination, "status": "pending"}
+
+
+async def apply_bulk_operation(visitor, operation: str, content_guid: str) -> dict:
+    """Apply one bulk operation to a content item and describe the outcome"""
+    content = await run_sdk(visitor.content.get, content_guid)
+
+    if operation in ("lock", "unlock"):
+        await run_sdk(content.update, locked=operation == "lock")
+        invalidate_content(content_guid)
+        update_snapshots(content_guid, {"locked": content["locked"]})
+        return {"locked": content["locked"]}
+
+    if operation == "delete":
+        await run_sdk(content.delete)
+        invalidate_content(content_guid)
+        update_snapshots(content_guid, None)
+        await asyncio.to_thread(usage_store.forget, content_guid)
+        return {}
+
+    # kill: ask Connect to destroy every running process of the content
+    jobs = await run_sdk(get_active_jobs, content)
+    await asyncio.gather(*(run_sdk(job.destroy) for job in jobs))
+    update_snapshots(content_guid, {"active_jobs": []})
+    return {"killed": len(jobs)}
+
+
+async def stream_bulk_operation(visitor, operation: str, guids: list[str]):
+    """
+    Run a bulk operation over many content items, at most `BULK_CONCURRENCY`
+    at a time, yielding each item's result as a line of NDJSON as it finishes.
+    """
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def apply(content_guid):
+        async with semaphore:
+            with tracer.start_as_current_span("bulk_item") as span:
+                span.set_attribute("content.guid", content_guid)
+                try:
+                    result = await apply_bulk_operation(visitor, operation, content_guid)
+                    return {"guid": content_guid, "status": "success", **result}
+                except ClientError as err:
+                    return {"guid": content_guid, "status": "error", "error": err.error_message}
+                except Exception as err:
+                    # One failing item should not abort the rest of the batch
+                    span.record_exception(err)
+                    return {"guid": content_guid, "status": "error", "error": str(err)}
+
+    with tracer.start_as_current_span("bulk_operation") as span:
+        span.set_attribute("bulk.operation", operation)
+        span.set_attribute("bulk.size", len(guids))
+        span.set_attribute("bulk.concurrency", BULK_CONCURRENCY)
+        failures = 0
+        for item in asyncio.as_completed([apply(guid) for guid in guids]):
+            result = await item
+            failures += result["status"] == "error"
+            yield orjson.dumps(result) + b"\n"
+        span.set_attribute("bulk.failures", failures)
+
+
+@app.post("/api/contents/bulk")
+async def bulk_contents(
+    operation: str = Body(...),
+    guids: list[str] = Body(...),
+    posit_connect_user_session_token: str = Header(None),
+):
+    """
+    Lock, unlock, delete or kill the processes of many content items in one
+    request. Results are streamed back as NDJSON, one line per item in the
+    order they finish.
+    """
+    if operation not in BULK_OPERATIONS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown bulk operation '{operation}'"
+        )
+
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    return StreamingResponse(
+        stream_bulk_operation(visitor, operation, list(dict.fromkeys(guids))),
+        media_type="application/x-ndjson",
+    )
 
 
 @app.get("/api/contents/{content_id}/author")
@@ -202,9 +1605,11 @@ async def get_author(
     content_id,
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    content = visitor.content.get(content_id)
-    return content.owner
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await get_content(visitor, posit_connect_user_session_token, content_id)
+    return await cached_read(
+        posit_connect_user_session_token, "owner", content_id, get_owner, content
+    )
 
 
 @app.get("/api/contents/{content_id}/releases")
@@ -212,21 +1617,227 @@ async def get_releases(
     content_id,
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    content = visitor.content.get(content_id)
-    return content.bundles.find()
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await get_content(visitor, posit_connect_user_session_token, content_id)
+    return await cached_read(
+        posit_connect_user_session_token, "bundles", content_id, content.bundles.find
+    )
+
+
+def parse_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
+
+
+async def fetch_usage(
+    visitor, visitor_guid: str, content_guid: str, since: float, until: float
+):
+    """Download the usage events between `since` and `until` into the store"""
+    with tracer.start_as_current_span("fetch_usage") as span:
+        span.set_attribute("usage.since", since)
+        span.set_attribute("usage.until", until)
+        events = await run_sdk(
+            visitor.metrics.usage.find,
+            content_guid=content_guid,
+            start=datetime.fromtimestamp(since, timezone.utc).isoformat(),
+            end=datetime.fromtimestamp(until, timezone.utc).isoformat(),
+        )
+        # Connect's range filter is inclusive; keep the half-open [since, until)
+        rows = [
+            (started, e["user_guid"])
+            for e in events
+            if since <= (started := parse_timestamp(e["started"])) < until
+        ]
+        span.set_attribute("usage.events", len(rows))
+        await asyncio.to_thread(
+            usage_store.replace, visitor_guid, content_guid, since, until, rows
+        )
+
+
+async def sync_usage(visitor, visitor_guid: str, content_guid: str, since: float):
+    """
+    Download what the visitor's store is missing since `since`, and the recent
+    events. The recent fetch also checks that the visitor may read usage.
+    """
+    now = time.time()
+    coverage = await asyncio.to_thread(usage_store.coverage, visitor_guid, content_guid)
+    if coverage is None:
+        missing = [(since, now)]
+    else:
+        stored_since, stored_until = coverage
+        missing = [
+            (since, stored_since),
+            (max(stored_since, stored_until - USAGE_REFRESH_WINDOW), now),
+        ]
+    missing = [(a, b) for a, b in missing if a < b]
+    trace.get_current_span().set_attribute("usage.fetches", len(missing))
+    await asyncio.gather(
+        *(fetch_usage(visitor, visitor_guid, content_guid, a, b) for a, b in missing)
+    )
+
+
+async def compact_usage_store():
+    """Drop usage events past the retention limit every USAGE_COMPACT_INTERVAL"""
+    while True:
+        with tracer.start_as_current_span("compact_usage_store") as span:
+            deleted = await asyncio.to_thread(
+                usage_store.compact, time.time() - USAGE_RETENTION
+            )
+            span.set_attribute("usage.deleted_events", deleted)
+        await asyncio.sleep(USAGE_COMPACT_INTERVAL)
+
+
+def usage_range(
+    start: datetime | None, end: datetime | None, bucket: str
+) -> tuple[float, float]:
+    """
+    Validate a usage query, returning its range as epoch seconds. The range
+    defaults to the 30 days up to `end`, or to the end of the current bucket.
+    """
+    if bucket not in USAGE_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket '{bucket}'")
+    width = USAGE_BUCKETS[bucket]
+
+    if end:
+        end_ts = end.replace(tzinfo=end.tzinfo or timezone.utc).timestamp()
+    else:
+        # The end of the current bucket, so repeated requests cover the same
+        # range and return the same document until something changes
+        end_ts = USAGE_BUCKET_ORIGIN + -(-(time.time() - USAGE_BUCKET_ORIGIN) // width) * width
+    start_ts = (
+        start.replace(tzinfo=start.tzinfo or timezone.utc).timestamp()
+        if start
+        else end_ts - USAGE_DEFAULT_RANGE
+    )
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    buckets = -(-(end_ts - USAGE_BUCKET_ORIGIN) // width) - (start_ts - USAGE_BUCKET_ORIGIN) // width
+    if buckets > USAGE_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans more than {USAGE_MAX_BUCKETS} {bucket} buckets",
+        )
+    return start_ts, end_ts
+
+
+async def get_usage(
+    visitor, token: str | None, content_guid: str, start_ts: float, end_ts: float, bucket: str
+) -> dict:
+    """
+    Hits per bucket between `start_ts` and `end_ts`, as parallel arrays of
+    bucket start times and hit counts.
+    """
+    width = USAGE_BUCKETS[bucket]
+
+    # Bucket indexes covered by the range; the last one may be partial
+    first = int((start_ts - USAGE_BUCKET_ORIGIN) // width)
+    last = int(-(-(end_ts - USAGE_BUCKET_ORIGIN) // width)) - 1
+
+    def bucket_start(index):
+        return USAGE_BUCKET_ORIGIN + index * width
+
+    # Buckets are counted from their own start, even if `start` falls inside
+    # one. Usage past the retention limit is not kept.
+    since = max(bucket_start(first), time.time() - USAGE_RETENTION)
+    # Connect filters usage by what the visitor may see, so each visitor's
+    # events are stored and counted apart from everyone else's
+    me = await cached_read(token, "me", "", lambda: visitor.me)
+    await single_flight(
+        (me["guid"], "usage", content_guid, since),
+        "usage",
+        lambda: sync_usage(visitor, me["guid"], content_guid, since),
+    )
+
+    counts = await asyncio.to_thread(
+        usage_store.counts, me["guid"], content_guid, bucket_start(first), end_ts, width
+    )
+    return {
+        "bucket": bucket,
+        "start": datetime.fromtimestamp(start_ts, timezone.utc).isoformat(),
+        "end": datetime.fromtimestamp(end_ts, timezone.utc).isoformat(),
+        "timestamps": [
+            datetime.fromtimestamp(bucket_start(i), timezone.utc).isoformat()
+            for i in range(first, last + 1)
+        ],
+        "hits": [counts.get(i, 0) for i in range(first, last + 1)],
+    }
 
 
 @app.get("/api/contents/{content_id}/metrics")
 async def get_metrics(
     content_id,
+    start: datetime | None = Query(None),
+    end: datetime | None = Query(None),
+    bucket: str = Query("day"),
     posit_connect_user_session_token: str = Header(None),
 ):
-    visitor = get_visitor_client(posit_connect_user_session_token)
-    content = visitor.content.get(content_id)
-    metrics = visitor.metrics.usage.find(content_guid=content["guid"])
-    return metrics
+    """
+    Hits per `bucket` ("hour", "day" or "week") between `start` and `end`,
+    defaulting to the last 30 days.
+    """
+    start_ts, end_ts = usage_range(start, end, bucket)
+    visitor = await run_sdk(get_visitor_client, posit_connect_user_session_token)
+    content = await get_content(visitor, posit_connect_user_session_token, content_id)
+    return await get_usage(
+        visitor, posit_connect_user_session_token, content["guid"], start_ts, end_ts, bucket
+    )
+
+
+# Parts of the content details only sent when asked for with `include`
+DETAILS_OPTIONAL_PARTS = ("metrics",)
+
+
+@app.get("/api/contents/{content_id}/details")
+async def get_content_details(
+    content_id,
+    include: str | None = None,
+    posit_connect_user_session_token: str = Header(None),
+):
+    """
+    Everything the Edit view shows about a content item in one response: the
+    content and, fetched concurrently once it is known, its owner, releases
+    and running processes. Daily usage over the last 30 days is added as
+    `metrics` when `include=metrics`. A part that fails is returned as null
+    with its error under "errors", so the rest of the page still renders.
+    """
+    optional = parse_fields(include, DETAILS_OPTIONAL_PARTS, ())
+    token = posit_connect_user_session_token
+    visitor = await run_sdk(get_visitor_client, token)
+    content = await get_content(visitor, token, content_id)
+
+    parts = {
+        "owner": lambda: cached_read(token, "owner", content_id, get_owner, content),
+        "releases": lambda: cached_read(
+            token, "bundles", content_id, content.bundles.find
+        ),
+        "processes": lambda: run_sdk(get_active_jobs, content),
+    }
+    if "metrics" in optional:
+        start_ts, end_ts = usage_range(None, None, "day")
+        parts["metrics"] = lambda: get_usage(
+            visitor, token, content["guid"], start_ts, end_ts, "day"
+        )
+
+    async def resolve(part, fetch):
+        with tracer.start_as_current_span(f"fetch_{part}") as span:
+            try:
+                return await fetch(), None
+            except ClientError as err:
+                return None, err.error_message
+            except Exception as err:
+                span.record_exception(err)
+                return None, str(err)
+
+    results = dict(
+        zip(parts, await asyncio.gather(*(resolve(p, f) for p, f in parts.items())))
+    )
+    return {
+        "content": content,
+        **{part: value for part, (value, _) in results.items()},
+        "errors": {part: error for part, (_, error) in results.items() if error},
+    }
+
 
-app.mount("/", StaticFiles(directory="dist", html=True), name="static")
+app.mount("/", PrecompressedStaticFiles(directory="dist", html=True), name="static")
 
 FastAPIInstrumentor.instrument_app(app)
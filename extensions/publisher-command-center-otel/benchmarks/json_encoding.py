@@ -0,0 +1,174 @@
+"""
+Compare the two ways of encoding a page of the content listing:
+
+- the default FastAPI path, `jsonable_encoder` over the posit-sdk resources
+  followed by `json.dumps`, as the listing was sent before
+- the items projected to the Home table's fields and encoded with orjson,
+  as it is sent now
+
+Run from the extension directory once the frontend has been built, e.g.
+
+    python benchmarks/json_encoding.py --items 100 1000 5000
+
+No requests are made to Connect.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("CONNECT_SERVER", "http://localhost:3939")
+os.environ.setdefault("CONNECT_API_KEY", "unused")
+os.environ.setdefault("USAGE_STORE_PATH", ":memory:")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from posit.connect.content import ContentItem  # noqa: E402
+
+import app  # noqa: E402
+
+
+def make_contents(count: int) -> list:
+    """Content items shaped like Connect's, each with a running process"""
+    contents = []
+    for i in range(count):
+        guid = f"{i:08x}-0000-4000-8000-000000000000"
+        item = ContentItem(
+            app.client._ctx,
+            guid=guid,
+            name=f"content-{i}",
+            title=f"Content {i}",
+            description="A piece of content used to benchmark JSON encoding. " * 3,
+            access_type="acl",
+            connection_timeout=None,
+            read_timeout=None,
+            init_timeout=None,
+            idle_timeout=None,
+            max_processes=None,
+            min_processes=None,
+            max_conns_per_process=None,
+            load_factor=None,
+            cpu_request=None,
+            cpu_limit=None,
+            memory_request=None,
+            memory_limit=None,
+            amd_gpu_limit=None,
+            nvidia_gpu_limit=None,
+            created_time="2024-01-01T00:00:00Z",
+            last_deployed_time="2024-06-01T12:00:00Z",
+            bundle_id="42",
+            app_mode="python-shiny",
+            content_category="",
+            parameterized=False,
+            cluster_name="Local",
+            image_name=None,
+            default_image_name=None,
+            default_r_environment_management=None,
+            default_py_environment_management=None,
+            service_account_name=None,
+            r_version=None,
+            r_environment_management=None,
+            py_version="3.12.4",
+            py_environment_management=True,
+            quarto_version=None,
+            run_as=None,
+            run_as_current_user=False,
+            owner_guid="11111111-0000-4000-8000-000000000000",
+            content_url=f"https://connect.example.com/content/{guid}/",
+            dashboard_url=f"https://connect.example.com/connect/#/apps/{guid}",
+            app_role="owner",
+            id=str(i),
+            locked=False,
+            locked_message="",
+            tags=[],
+            owner={
+                "guid": "11111111-0000-4000-8000-000000000000",
+                "username": "publisher",
+                "first_name": "Pat",
+                "last_name": "Publisher",
+            },
+        )
+        # The SDK's job resources are dicts too, and encode the same
+        item["active_jobs"] = [
+            dict(
+                id=str(i),
+                ppid="1",
+                pid=str(1000 + i),
+                key=f"job{i}",
+                remote_id=None,
+                app_id=str(i),
+                variant_id="0",
+                bundle_id="42",
+                start_time="2024-06-01T12:00:00Z",
+                end_time=None,
+                last_heartbeat_time="2024-06-01T12:05:00Z",
+                queued_time=None,
+                status=0,
+                exit_code=None,
+                tag="run_app",
+                hostname="connect-0",
+                cluster=None,
+                image=None,
+                run_as="rstudio-connect",
+            )
+        ]
+        contents.append(item)
+    return contents
+
+
+def fastapi_default(page: list) -> bytes:
+    body = {"results": page, "paging": {"total": len(page), "cursors": {"next": None}}}
+    return json.dumps(jsonable_encoder(body), separators=(",", ":")).encode()
+
+
+def projected_orjson(page: list) -> bytes:
+    body = {
+        "results": [
+            app.project_content(c, app.CONTENTS_DEFAULT_FIELDS) for c in page
+        ],
+        "paging": {"total": len(page), "cursors": {"next": None}},
+    }
+    return orjson.dumps(body)
+
+
+def measure(encode, page: list, repeat: int) -> tuple[float, int]:
+    """Median encode time in milliseconds, and the payload size in bytes"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = encode(page)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'items':>6}  {'path':<18} {'median ms':>10} {'bytes':>10}")
+    for count in args.items:
+        page = make_contents(count)
+        results = {
+            "fastapi default": measure(fastapi_default, page, args.repeat),
+            "projected orjson": measure(projected_orjson, page, args.repeat),
+        }
+        for path, (ms, size) in results.items():
+            print(f"{count:>6}  {path:<18} {ms:>10.2f} {size:>10}")
+        default_ms, default_size = results["fastapi default"]
+        orjson_ms, orjson_size = results["projected orjson"]
+        print(
+            f"{'':>6}  {'speedup':<18} {default_ms / orjson_ms:>9.1f}x"
+            f" {default_size / orjson_size:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Measure the app's latency, throughput and upstream call counts under load,
+against the mock Connect server in `mock_connect.py`:
+
+- home: the Home listing, streamed the way the Home view loads it
+- edit: the Edit view's content details
+- bulk_kill: stopping the processes of several content items at once
+
+Run from the extension directory once the frontend has been built, e.g.
+
+    python benchmarks/load.py --contents 2000 --latency 20 --concurrency 16
+    python benchmarks/load.py --json before.json
+    python benchmarks/load.py --baseline before.json
+
+Each scenario reports p50/p95/p99 latency, requests per second, and the
+number of Connect API calls each request cost. `--json` saves the results,
+and `--baseline` prints the change from results saved earlier. No requests
+are made to Connect.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+os.environ.setdefault("CONNECT_API_KEY", "unused")
+os.environ.setdefault("USAGE_STORE_PATH", ":memory:")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import mock_connect  # noqa: E402
+
+SCENARIOS = ("home", "edit", "bulk_kill")
+
+
+def start_mock(**options) -> tuple[str, object]:
+    """Serve a mock Connect on a free local port, returning its URL and app"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    mock = mock_connect.create_app(**options)
+    server = uvicorn.Server(
+        uvicorn.Config(mock, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", mock
+
+
+def scenario_requests(name: str, guids: list[str], bulk_size: int):
+    """The request for the `i`th call of a scenario, as httpx arguments"""
+    if name == "home":
+        return lambda i: {
+            "method": "GET",
+            "url": "/api/contents",
+            "params": {"stream": "true", "page_size": 50},
+        }
+    if name == "edit":
+        return lambda i: {
+            "method": "GET",
+            "url": f"/api/contents/{guids[i % len(guids)]}/details",
+        }
+    if name == "bulk_kill":
+        return lambda i: {
+            "method": "POST",
+            "url": "/api/contents/bulk",
+            "json": {
+                "operation": "kill",
+                "guids": [
+                    guids[(i * bulk_size + n) % len(guids)] for n in range(bulk_size)
+                ],
+            },
+        }
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run_scenario(
+    app, mock, name: str, guids: list[str], args: argparse.Namespace
+) -> dict:
+    """Send `args.requests` requests from `args.concurrency` workers"""
+    make_request = scenario_requests(name, guids, args.bulk_size)
+    transport = httpx.ASGITransport(app=app.app)
+    latencies = []
+    errors = 0
+    issued = iter(range(args.requests))
+
+    async def worker(http: httpx.AsyncClient):
+        nonlocal errors
+        for i in issued:
+            if args.cold:
+                with app.response_cache_lock:
+                    app.response_cache.clear()
+            start = time.perf_counter()
+            response = await http.request(**make_request(i))
+            # Streamed bodies count as done once the last line has arrived
+            body = response.content
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200 or b'"status":"error"' in body:
+                errors += 1
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://app", timeout=120
+    ) as http:
+        for i in range(args.warmup):
+            await http.request(**make_request(i))
+        mock.state.calls.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(http) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    calls = Counter(mock.state.calls)
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": percentiles[49],
+        "p95_ms": percentiles[94],
+        "p99_ms": percentiles[98],
+        "throughput_rps": len(latencies) / elapsed,
+        "upstream_per_request": sum(calls.values()) / len(latencies),
+        "upstream_by_endpoint": {
+            endpoint: count / len(latencies) for endpoint, count in calls.most_common()
+        },
+    }
+
+
+def print_results(results: dict, baseline: dict | None):
+    columns = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "upstream_per_request")
+    print(f"{'scenario':<10} {'requests':>8} {'errors':>6}", end="")
+    for column in columns:
+        print(f" {column:>20}", end="")
+    print()
+
+    for name, result in results.items():
+        print(f"{name:<10} {result['requests']:>8} {result['errors']:>6}", end="")
+        for column in columns:
+            value = f"{result[column]:.2f}"
+            previous = (baseline or {}).get(name, {}).get(column)
+            if previous:
+                value += f" ({(result[column] - previous) / previous:+.0%})"
+            print(f" {value:>20}", end="")
+        print()
+        for endpoint, count in result["upstream_by_endpoint"].items():
+            print(f"{'':<10}   {count:>7.2f} x {endpoint}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--cold",
+        action="store_true",
+        help="empty the response cache before every request",
+    )
+    parser.add_argument("--bulk-size", type=int, default=20)
+    parser.add_argument("--contents", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=2)
+    parser.add_argument("--bundles", type=int, default=5)
+    parser.add_argument("--visits", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds")
+    parser.add_argument("--jitter", type=float, default=5, help="milliseconds")
+    parser.add_argument("--json", help="save the results to this file")
+    parser.add_argument("--baseline", help="compare with results saved by --json")
+    args = parser.parse_args()
+
+    url, mock = start_mock(
+        contents=args.contents,
+        jobs=args.jobs,
+        bundles=args.bundles,
+        visits=args.visits,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+    )
+    os.environ["CONNECT_SERVER"] = url
+
+    # Imported once the mock is up, as the app connects to it on import
+    import app
+
+    guids = [mock_connect.content_json(i)["guid"] for i in range(args.contents)]
+
+    async def run_scenarios():
+        return {
+            name: await run_scenario(app, mock, name, guids, args)
+            for name in args.scenarios
+        }
+
+    results = asyncio.run(run_scenarios())
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"options": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+A stand-in for the parts of the Connect API the command center uses, serving
+synthetic content, jobs, bundles, owners and usage with a configurable size
+and response latency. Every request is counted by route, so a benchmark can
+report how many upstream calls each of its requests cost.
+
+It is used in-process by `load.py`, and can also be run on its own to develop
+against without a Connect server:
+
+    python benchmarks/mock_connect.py --port 3939 --contents 2000 --latency 20
+
+then start the app with CONNECT_SERVER=http://localhost:3939 and any
+CONNECT_API_KEY.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+OWNER_GUID = "11111111-0000-4000-8000-000000000000"
+OWNER = {
+    "guid": OWNER_GUID,
+    "username": "publisher",
+    "first_name": "Pat",
+    "last_name": "Publisher",
+    "email": "publisher@example.com",
+    "user_role": "publisher",
+    "created_time": "2023-01-01T00:00:00Z",
+    "updated_time": "2023-01-01T00:00:00Z",
+    "active_time": "2024-06-01T12:00:00Z",
+    "confirmed": True,
+    "locked": False,
+}
+APP_MODES = ["python-shiny", "shiny", "python-fastapi", "quarto-static", "rmd-static"]
+
+
+def content_json(i: int) -> dict:
+    """Content item `i`, shaped like Connect's v1 content response"""
+    guid = f"{i:08x}-0000-4000-8000-000000000000"
+    return {
+        "guid": guid,
+        "name": f"content-{i}",
+        "title": f"Content {i}",
+        "description": "Synthetic content served by the mock Connect server. " * 3,
+        "access_type": "acl",
+        "locked": False,
+        "locked_message": "",
+        "connection_timeout": None,
+        "read_timeout": None,
+        "init_timeout": None,
+        "idle_timeout": None,
+        "max_processes": None,
+        "min_processes": None,
+        "max_conns_per_process": None,
+        "load_factor": None,
+        "cpu_request": None,
+        "cpu_limit": None,
+        "memory_request": None,
+        "memory_limit": None,
+        "amd_gpu_limit": None,
+        "nvidia_gpu_limit": None,
+        "created_time": "2024-01-01T00:00:00Z",
+        "last_deployed_time": (
+            datetime(2024, 6, 1, tzinfo=timezone.utc) + timedelta(hours=i)
+        ).isoformat(),
+        "bundle_id": str(i),
+        "app_mode": APP_MODES[i % len(APP_MODES)],
+        "content_category": "",
+        "parameterized": False,
+        "cluster_name": "Local",
+        "image_name": None,
+        "default_image_name": None,
+        "default_r_environment_management": None,
+        "default_py_environment_management": None,
+        "service_account_name": None,
+        "r_version": "4.4.1" if i % 2 else None,
+        "r_environment_management": None,
+        "py_version": None if i % 2 else "3.12.4",
+        "py_environment_management": True,
+        "quarto_version": None,
+        "run_as": None,
+        "run_as_current_user": False,
+        "owner_guid": OWNER_GUID,
+        "content_url": f"https://connect.example.com/content/{guid}/",
+        "dashboard_url": f"https://connect.example.com/connect/#/apps/{guid}",
+        "vanity_url": None,
+        "app_role": "owner",
+        "id": str(i),
+        "tags": [],
+    }
+
+
+def job_json(content: dict, n: int) -> dict:
+    """The `n`th running process of a content item"""
+    i = int(content["id"])
+    return {
+        "id": str(i * 100 + n),
+        "ppid": "1",
+        "pid": str(1000 + i * 100 + n),
+        "key": f"job-{i}-{n}",
+        "remote_id": None,
+        "app_id": content["id"],
+        "variant_id": "0",
+        "bundle_id": content["bundle_id"],
+        "start_time": "2024-06-01T12:00:00Z",
+        "end_time": None,
+        "last_heartbeat_time": "2024-06-01T12:05:00Z",
+        "queued_time": None,
+        "status": 0,
+        "exit_code": None,
+        "tag": "run_app",
+        "hostname": "connect-0",
+        "cluster": None,
+        "image": None,
+        "run_as": "rstudio-connect",
+    }
+
+
+def bundle_json(content: dict, n: int) -> dict:
+    return {
+        "id": f"{content['id']}{n}",
+        "content_guid": content["guid"],
+        "created_time": "2024-06-01T12:00:00Z",
+        "cluster_name": "Local",
+        "image_name": None,
+        "r_version": content["r_version"],
+        "py_version": content["py_version"],
+        "quarto_version": None,
+        "active": n == 0,
+        "size": 123456,
+        "metadata": {},
+    }
+
+
+def create_app(
+    contents: int = 500,
+    jobs: int = 2,
+    bundles: int = 5,
+    visits: int = 2000,
+    latency: float = 0.02,
+    jitter: float = 0.005,
+    seed: int = 0,
+) -> FastAPI:
+    """
+    A mock Connect serving `contents` items, each with `jobs` running
+    processes, `bundles` bundles and `visits` visits spread over the last 30
+    days. Every response is delayed by `latency` seconds, give or take up to
+    `jitter`.
+
+    Stopping a process or changing content is accepted but not applied, so
+    repeated benchmark runs see the same data.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    items = {c["guid"]: c for c in map(content_json, range(contents))}
+    now = time.time()
+    visit_times = {
+        guid: sorted(now - rng.random() * 30 * 86400 for _ in range(visits))
+        for guid in items
+    }
+    app.state.calls = Counter()
+
+    @app.middleware("http")
+    async def delay_and_count(request: Request, call_next):
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        response = await call_next(request)
+        route = request.scope.get("route")
+        app.state.calls[f"{request.method} {route.path if route else request.url.path}"] += 1
+        return response
+
+    def get_item(guid: str) -> dict:
+        if guid not in items:
+            raise HTTPException(status_code=404, detail="Content not found")
+        return items[guid]
+
+    @app.get("/__api__/server_settings")
+    def server_settings():
+        return {"version": "2025.09.0"}
+
+    @app.get("/__api__/v1/content")
+    def find_content():
+        return list(items.values())
+
+    @app.get("/__api__/v1/content/{guid}")
+    def get_content(guid: str):
+        return get_item(guid)
+
+    @app.patch("/__api__/v1/content/{guid}")
+    async def update_content(guid: str, request: Request):
+        return {**get_item(guid), **(await request.json())}
+
+    @app.delete("/__api__/v1/content/{guid}")
+    def delete_content(guid: str):
+        get_item(guid)
+        return Response(status_code=204)
+
+    @app.get("/__api__/v1/content/{guid}/jobs")
+    def find_jobs(guid: str):
+        content = get_item(guid)
+        return [job_json(content, n) for n in range(jobs)]
+
+    @app.get("/__api__/v1/content/{guid}/jobs/{key}")
+    def get_job(guid: str, key: str):
+        content = get_item(guid)
+        return {**job_json(content, 0), "key": key}
+
+    @app.delete("/__api__/v1/content/{guid}/jobs/{key}")
+    def destroy_job(guid: str, key: str):
+        get_item(guid)
+        return Response(status_code=204)
+
+    @app.get("/__api__/v1/content/{guid}/bundles")
+    def find_bundles(guid: str):
+        content = get_item(guid)
+        return [bundle_json(content, n) for n in range(bundles)]
+
+    @app.get("/__api__/v1/user")
+    def get_me():
+        return OWNER
+
+    @app.get("/__api__/v1/users/{guid}")
+    def get_user(guid: str):
+        return {**OWNER, "guid": guid}
+
+    @app.get("/__api__/v1/instrumentation/shiny/usage")
+    def find_shiny_usage():
+        return {"paging": {"cursors": {"next": None}}, "results": []}
+
+    @app.get("/__api__/v1/instrumentation/content/visits")
+    def find_visits(request: Request):
+        # The range is read from the query string directly, as `from` can't
+        # be a parameter name
+        query = request.query_params
+        guid = query.get("content_guid")
+        since = datetime.fromisoformat(query["from"]).timestamp() if "from" in query else 0
+        until = datetime.fromisoformat(query["to"]).timestamp() if "to" in query else now
+        matching = [t for t in visit_times.get(guid, []) if since <= t <= until]
+        offset = int(query.get("next") or 0)
+        limit = int(query.get("limit") or 500)
+        page = matching[offset : offset + limit]
+        more = offset + limit < len(matching)
+        return {
+            "paging": {"cursors": {"next": str(offset + limit) if more else None}},
+            "results": [
+                {
+                    "content_guid": guid,
+                    "user_guid": OWNER_GUID,
+                    "variant_key": None,
+                    "rendering_id": None,
+                    "bundle_id": 1,
+                    "time": datetime.fromtimestamp(t, timezone.utc).isoformat(),
+                    "data_version": 1,
+                    "path": "/",
+                }
+                for t in page
+            ],
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=3939)
+    parser.add_argument("--contents", type=int, default=500)
+    parser.add_argument("--jobs", type=int, default=2)
+    parser.add_argument("--bundles", type=int, default=5)
+    parser.add_argument("--visits", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=20, help="milliseconds")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    app = create_app(
+        contents=args.contents,
+        jobs=args.jobs,
+        bundles=args.bundles,
+        visits=args.visits,
+        latency=args.latency / 1000,
+    )
+    uvicorn.run(app, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
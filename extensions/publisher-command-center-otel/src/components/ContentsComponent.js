@@ -1,11 +1,170 @@
 import m from "mithril";
-import { format } from "date-fns";
+import { format, formatDistanceToNow } from "date-fns";
 import Contents from "../models/Contents";
 import Languages from "./Languages";
 import LockContentButton from "./LockContentButton";
 import DeleteModal from "./DeleteModal";
 import RenameModal from "./RenameModal";
 
+const SortableHeader = {
+  view: function (vnode) {
+    const { field, label } = vnode.attrs;
+    const active = Contents.sort.replace(/^-/, "") === field;
+    const descending = Contents.sort.startsWith("-");
+
+    let icon = "fa-sort text-body-tertiary";
+    if (active) {
+      icon = descending ? "fa-sort-down" : "fa-sort-up";
+    }
+
+    return m(
+      "th",
+      {
+        scope: "col",
+        style: { cursor: "pointer" },
+        ariaSort: active ? (descending ? "descending" : "ascending") : "none",
+        onclick: () => {
+          Contents.setSort(active && !descending ? `-${field}` : field);
+        },
+      },
+      [label, " ", m(`i.fa-solid.${icon}`)],
+    );
+  },
+};
+
+// The field shows what has been typed straight away; only the search itself
+// waits until typing pauses
+const SearchBox = {
+  oninit: function (vnode) {
+    vnode.state.text = Contents.search;
+    vnode.state.timer = null;
+  },
+
+  onremove: function (vnode) {
+    clearTimeout(vnode.state.timer);
+  },
+
+  view: function (vnode) {
+    return m("input.form-control.mb-3", {
+      type: "search",
+      placeholder: "Search content",
+      ariaLabel: "Search content",
+      value: vnode.state.text,
+      oninput: (e) => {
+        const value = e.target.value;
+        vnode.state.text = value;
+        clearTimeout(vnode.state.timer);
+        vnode.state.timer = setTimeout(() => {
+          Contents.setSearch(value);
+        }, 300);
+      },
+    });
+  },
+};
+
+const Pagination = {
+  view: function () {
+    return m(".d-flex.justify-content-between.align-items-center", [
+      m("small.text-secondary", [
+        `${Contents.total} items`,
+        Contents.refreshedAt
+          ? ` · updated ${formatDistanceToNow(Contents.refreshedAt, { addSuffix: true })}`
+          : "",
+      ]),
+      m(".btn-group", [
+        m(
+          "button.btn.btn-sm.btn-outline-primary",
+          {
+            disabled: !Contents.hasPrevious(),
+            onclick: () => Contents.previousPage(),
+          },
+          [m("i.fa-solid.fa-chevron-left"), " Previous"],
+        ),
+        m(
+          "button.btn.btn-sm.btn-outline-primary",
+          {
+            disabled: !Contents.hasNext(),
+            onclick: () => Contents.nextPage(),
+          },
+          ["Next ", m("i.fa-solid.fa-chevron-right")],
+        ),
+      ]),
+    ]);
+  },
+};
+
+const BulkActions = {
+  running: false,
+  error: null,
+
+  run: async function (operation) {
+    this.running = true;
+    this.error = null;
+    try {
+      const failures = await Contents.bulk(operation);
+      if (failures.length > 0) {
+        this.error = `${failures.length} item(s) failed: ${failures[0].error}`;
+      }
+    } catch (err) {
+      this.error = err.message;
+    } finally {
+      this.running = false;
+      m.redraw();
+    }
+  },
+
+  view: function () {
+    const count = Contents.selected.size;
+    if (count === 0 && !this.error) {
+      return null;
+    }
+
+    const button = (operation, label, icon, style = "btn-outline-secondary") =>
+      m(
+        `button.btn.btn-sm.${style}`,
+        {
+          disabled: this.running || count === 0,
+          onclick: () => {
+            if (
+              operation === "delete" &&
+              !window.confirm(`Delete ${count} selected item(s)? This cannot be undone.`)
+            ) {
+              return;
+            }
+            this.run(operation);
+          },
+        },
+        [m(`i.fa-solid.${icon}`), ` ${label}`],
+      );
+
+    return m(".d-flex.align-items-center.gap-2.mb-3", [
+      m("small.text-secondary", `${count} selected`),
+      m(".btn-group", [
+        button("lock", "Lock", "fa-lock"),
+        button("unlock", "Unlock", "fa-lock-open"),
+        button("kill", "Stop processes", "fa-stop"),
+        button("delete", "Delete", "fa-trash", "btn-outline-danger"),
+      ]),
+      this.running
+        ? m(".spinner-border.spinner-border-sm.text-primary", { role: "status" },
+            m("span.visually-hidden", "Working..."),
+          )
+        : null,
+      this.error ? m("small.text-danger", this.error) : null,
+    ]);
+  },
+};
+
+const LoadingRows = {
+  view: function () {
+    return m(".d-flex.justify-content-center.my-3",
+      m(".spinner-border.spinner-border-sm.text-primary", { role: "status" },
+        m("span.visually-hidden", "Loading..."),
+      ),
+    );
+  },
+};
+
 const ContentsComponent = {
   error: null,
 
@@ -24,25 +183,45 @@ const ContentsComponent = {
     }
 
     const contents = Contents.data;
+    // Every branch starts with the search box, so it keeps its element and
+    // focus as the listing loads
     if (contents === null) {
-      return;
+      return [m(SearchBox)];
+    }
+
+    if (contents.length === 0 && Contents.loading) {
+      return [m(SearchBox), m(LoadingRows)];
     }
 
     if (contents.length === 0) {
-      return "";
+      return Contents.search
+        ? [m(SearchBox), m("p.text-secondary", "No content matches your search.")]
+        : [];
     }
 
-    return m(
+    const allSelected = contents.every((c) => Contents.selected.has(c.guid));
+
+    return [m(SearchBox), m(BulkActions), m(
       "table",
       { class: "table" },
       m(
         "thead",
         m("tr", [
-          m("th", { scope: "col" }, "Title"),
+          m(
+            "th",
+            { scope: "col" },
+            m("input.form-check-input", {
+              type: "checkbox",
+              ariaLabel: "Select all content on this page",
+              checked: allSelected,
+              onchange: () => Contents.toggleSelectAll(),
+            }),
+          ),
+          m(SortableHeader, { field: "title", label: "Title" }),
           m("th", { scope: "col" }, "Language"),
           m("th", { scope: "col" }, "Running Processes"),
-          m("th", { scope: "col" }, "Last Updated"),
-          m("th", { scope: "col" }, "Date Added"),
+          m(SortableHeader, { field: "last_deployed_time", label: "Last Updated" }),
+          m(SortableHeader, { field: "created_time", label: "Date Added" }),
           m("th", { scope: "col" }, ""),
           m("th", { scope: "col" }, ""),
           m("th", { scope: "col" }, ""),
@@ -51,12 +230,21 @@ const ContentsComponent = {
       ),
       m(
         "tbody",
-        Contents.data.map((content) => {
+        contents.map((content) => {
           const guid = content["guid"];
           const title = content["title"];
           return m(
             "tr",
             [
+              m(
+                "td",
+                m("input.form-check-input", {
+                  type: "checkbox",
+                  ariaLabel: `Select ${title}`,
+                  checked: Contents.selected.has(guid),
+                  onchange: () => Contents.toggleSelected(guid),
+                }),
+              ),
               m(
                 "td",
                   {
@@ -127,7 +315,7 @@ const ContentsComponent = {
           );
         }),
       ),
-    )
+    ), Contents.loading ? m(LoadingRows) : m(Pagination)]
   },
 };
 
@@ -5,8 +5,9 @@ const TimeseriesChart = {
   oncreate: function (vnode) {
       // Initialize the chart when the component is created
       const ctx = vnode.dom.getContext('2d');
-      const labels = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun'];
-      const data = [10, 20, 15, 25, 30, 20];
+      const { timestamps, hits, bucket } = vnode.attrs;
+      const labels = timestamps.map((t) => new Date(t).toLocaleDateString());
+      const data = hits;
 
       new Chart(ctx, {
           type: 'line',
@@ -27,7 +28,7 @@ const TimeseriesChart = {
                   x: {
                       title: {
                           display: true,
-                          text: 'Month'
+                          text: bucket
                       }
                   },
                   y: {
@@ -68,13 +69,23 @@ export default {
       return;
     }
 
-    const start = Math.min(...metrics.map(metric => new Date(metric?.started)))
-    const ended = Math.max(...metrics.map(metric => new Date(metric?.ended)))
-    console.log(start, ended)
-
     return m(".pt-3.border-top", [
       m("h5", "Metrics"),
-      m(TimeseriesChart),
+      m(
+        ".btn-group.btn-group-sm.mb-2",
+        ["hour", "day", "week"].map((bucket) =>
+          m(
+            "button.btn",
+            {
+              class: bucket === Metrics.bucket ? "btn-primary" : "btn-outline-primary",
+              onclick: () => Metrics.setBucket(vnode.attrs.id, bucket),
+            },
+            bucket,
+          ),
+        ),
+      ),
+      // Keyed so the chart is rebuilt when a new bucket size loads
+      m(TimeseriesChart, { key: metrics.bucket, ...metrics }),
     ]);
   },
 };
@@ -29,10 +29,16 @@ const StopButton = {
             vnode.attrs.content_id,
             vnode.attrs.process_id
           )
-            .then(() => {
-              console.log(`Stopped process ${vnode.attrs.process_id}`);
+            .then((termination) => {
+              if (termination.status === "terminated") {
+                console.log(`Stopped process ${vnode.attrs.process_id}`);
+              } else {
+                console.warn(
+                  `Process ${vnode.attrs.process_id} did not stop: ${termination.status}`,
+                );
+              }
               Processes.reset();
-              return Processes.load();
+              return Processes.load(vnode.attrs.content_id);
             })
             .then(() => {
               m.redraw(); // Trigger UI refresh after reload
@@ -1,4 +1,4 @@
-import m from "mithril";
+import request from "./request";
 
 const Author = {
   data: null,
@@ -13,8 +13,7 @@ const Author = {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents/${id}/author` })
+    this._fetch = request({ url: `api/contents/${id}/author` })
       .then((result) => {
         this.data = result;
         this._fetch = null;
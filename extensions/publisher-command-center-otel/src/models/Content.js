@@ -1,9 +1,15 @@
-import m from "mithril";
+import Author from "./Author";
+import Processes from "./Processes";
+import Releases from "./Releases";
+import request from "./request";
 
 const Content = {
   data: null,
   _fetch: null,
 
+  // Loads the content together with everything else the Edit view shows, and
+  // hands each panel's part to its model. A panel whose part failed loads it
+  // itself.
   load: function (id) {
     if (this.data) {
       return Promise.resolve(this.data);
@@ -13,10 +19,12 @@ const Content = {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents/${id}` })
+    this._fetch = request({ url: `api/contents/${id}/details` })
       .then((result) => {
-        this.data = result;
+        Author.data = result.owner;
+        Releases.data = result.releases;
+        Processes.data = result.processes;
+        this.data = result.content;
         this._fetch = null;
       })
       .catch((err) => {
@@ -1,9 +1,45 @@
 import m from "mithril";
+import request, { isRemembered, rememberResponse } from "./request";
+
+// The fields of each content item the Home table renders
+const FIELDS = [
+  "guid",
+  "title",
+  "app_mode",
+  "content_category",
+  "r_version",
+  "py_version",
+  "quarto_version",
+  "locked",
+  "last_deployed_time",
+  "created_time",
+  "content_url",
+  "active_jobs",
+];
 
 export default {
   data: null,
+  total: 0,
+  pageSize: 50,
+  sort: "title",
+  search: "",
+  // Cursors of the pages visited so far; the last one is the current page
+  cursors: [null],
+  nextCursor: null,
+  // When the server's snapshot of the listing was taken, or null if the
+  // listing was fetched live
+  refreshedAt: null,
+  // True while rows of the current page are still streaming in
+  loading: false,
+  // Guids of the rows checked for a bulk action
+  selected: new Set(),
   _fetch: null,
+  _controller: null,
 
+  // Streams the page as NDJSON so rows render as soon as the server has
+  // looked up their running processes, rather than after the whole page.
+  // A page streamed before is revalidated with its ETag instead, and reused
+  // if it hasn't changed.
   load: function () {
     if (this.data) {
       return Promise.resolve(this.data);
@@ -13,16 +49,162 @@ export default {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents` })
-      .then((result) => {
-        this.data = result;
+    const params = {
+      page_size: this.pageSize,
+      sort: this.sort,
+      fields: FIELDS.join(","),
+    };
+    const cursor = this.cursors[this.cursors.length - 1];
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    if (this.search) {
+      params.search = this.search;
+    }
+    const listing = { url: "api/contents", params };
+
+    const controller = new AbortController();
+    this._controller = controller;
+    this.loading = true;
+
+    this._fetch = (
+      isRemembered(listing)
+        ? this._revalidate(listing, controller)
+        : this._stream(listing, controller)
+    )
+      .then(() => {
+        this.loading = false;
         this._fetch = null;
+        m.redraw();
       })
       .catch((err) => {
+        if (controller.signal.aborted) {
+          return;
+        }
+        this.loading = false;
         this._fetch = null;
         throw err;
       });
+
+    return this._fetch;
+  },
+
+  _stream: function (listing, controller) {
+    const params = new URLSearchParams({ ...listing.params, stream: "true" });
+
+    return fetch(`${listing.url}?${params}`, { signal: controller.signal }).then(
+      (response) => {
+        if (!response.ok) {
+          throw new Error(`Failed to load content: ${response.status}`);
+        }
+        this.total = Number(response.headers.get("X-Total-Count"));
+        this.nextCursor = response.headers.get("X-Next-Cursor");
+        this.refreshedAt = response.headers.get("X-Snapshot-Refreshed-At");
+
+        // Rows arrive in completion order; keep them in page order
+        const rows = new Array(
+          Number(response.headers.get("X-Result-Count")),
+        ).fill(null);
+        this.data = [];
+        m.redraw();
+
+        return this._readLines(response.body, (line) => {
+          // The last line tags the page as the unstreamed listing
+          if (line.etag) {
+            rememberResponse(listing, line.etag, {
+              results: rows,
+              paging: { total: this.total, cursors: { next: this.nextCursor } },
+              snapshot: this.refreshedAt
+                ? { refreshed_at: this.refreshedAt }
+                : null,
+            });
+            return;
+          }
+          rows[line.index] = line.content;
+          this.data = rows.filter((row) => row !== null);
+          m.redraw();
+        });
+      },
+    );
+  },
+
+  _revalidate: function (listing, controller) {
+    return request(listing).then((page) => {
+      // The page was left while the request was in flight
+      controller.signal.throwIfAborted();
+      this.total = page.paging.total;
+      this.nextCursor = page.paging.cursors.next;
+      this.refreshedAt = page.snapshot ? page.snapshot.refreshed_at : null;
+      this.data = page.results;
+    });
+  },
+
+  _readLines: async function (body, onLine) {
+    const reader = body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffered = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffered += value;
+      const lines = buffered.split("\n");
+      buffered = lines.pop();
+      lines.filter((line) => line).forEach((line) => onLine(JSON.parse(line)));
+    }
+  },
+
+  // Drops the current page and its selection, cancelling it if it is still
+  // streaming
+  _clear: function () {
+    if (this._controller) {
+      this._controller.abort();
+      this._controller = null;
+    }
+    this.data = null;
+    this._fetch = null;
+    this.selected.clear();
+  },
+
+  hasPrevious: function () {
+    return this.cursors.length > 1;
+  },
+
+  hasNext: function () {
+    return this.nextCursor !== null;
+  },
+
+  nextPage: function () {
+    if (!this.hasNext()) {
+      return;
+    }
+    this.cursors.push(this.nextCursor);
+    this._clear();
+    return this.load();
+  },
+
+  previousPage: function () {
+    if (!this.hasPrevious()) {
+      return;
+    }
+    this.cursors.pop();
+    this._clear();
+    return this.load();
+  },
+
+  // Changing the sort order or search restarts from the first page
+  setSort: function (sort) {
+    this.sort = sort;
+    this.cursors = [null];
+    this._clear();
+    return this.load();
+  },
+
+  setSearch: function (search) {
+    this.search = search;
+    this.cursors = [null];
+    this._clear();
+    return this.load();
   },
 
   delete: async function (guid) {
@@ -32,6 +214,7 @@ export default {
     });
 
     this.data = this.data.filter((c) => c.guid !== guid);
+    this.total -= 1;
   },
 
   lock: async function (guid) {
@@ -57,8 +240,70 @@ export default {
     });
   },
 
+  toggleSelected: function (guid) {
+    if (this.selected.has(guid)) {
+      this.selected.delete(guid);
+    } else {
+      this.selected.add(guid);
+    }
+  },
+
+  // Selects every row of the current page, or clears the selection if they
+  // are all selected already
+  toggleSelectAll: function () {
+    const guids = (this.data || []).map((c) => c.guid);
+    if (guids.every((guid) => this.selected.has(guid))) {
+      this.selected.clear();
+    } else {
+      guids.forEach((guid) => this.selected.add(guid));
+    }
+  },
+
+  // Runs `operation` ("lock", "unlock", "delete" or "kill") on every selected
+  // row in one request, applying each result as the server streams it back.
+  // Resolves to the results that failed.
+  bulk: async function (operation) {
+    const guids = [...this.selected];
+    const failures = [];
+
+    const response = await fetch("api/contents/bulk", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ operation, guids }),
+    });
+    if (!response.ok) {
+      throw new Error(`Failed to ${operation} content: ${response.status}`);
+    }
+
+    await this._readLines(response.body, (result) => {
+      if (result.status !== "success") {
+        failures.push(result);
+        m.redraw();
+        return;
+      }
+
+      this.selected.delete(result.guid);
+      if (operation === "delete") {
+        this.data = this.data.filter((c) => c.guid !== result.guid);
+        this.total -= 1;
+      } else {
+        const targetContent = this.data.find((c) => c.guid === result.guid);
+        if (targetContent && operation === "kill") {
+          targetContent.active_jobs = [];
+        } else if (targetContent) {
+          targetContent.locked = result.locked;
+        }
+      }
+      m.redraw();
+    });
+
+    return failures;
+  },
+
   reset: function () {
-    this.data = null;
-    this._fetch = null;
+    this._clear();
+    this.loading = false;
+    this.cursors = [null];
+    this.nextCursor = null;
   },
 };
@@ -1,9 +1,13 @@
-import m from "mithril";
+import request from "./request";
 
 export default {
   data: null,
+  // "hour", "day" or "week"
+  bucket: "day",
   _fetch: null,
 
+  // Loads the hits per bucket over the last 30 days as parallel arrays of
+  // bucket start times and counts
   load: function (id) {
     if (this.data) {
       return Promise.resolve(this.data);
@@ -13,8 +17,10 @@ export default {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents/${id}/metrics` })
+    this._fetch = request({
+      url: `api/contents/${id}/metrics`,
+      params: { bucket: this.bucket },
+    })
       .then((result) => {
         this.data = result;
         this._fetch = null;
@@ -25,6 +31,12 @@ export default {
       });
   },
 
+  setBucket: function (id, bucket) {
+    this.bucket = bucket;
+    this.reset();
+    return this.load(id);
+  },
+
   reset: function () {
     this.data = null;
     this._fetch = null;
@@ -1,5 +1,7 @@
 import m from "mithril";
 
+import request from "./request";
+
 const Processes = {
   data: null,
   _fetch: null,
@@ -13,8 +15,7 @@ const Processes = {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents/${id}/processes` })
+    this._fetch = request({ url: `api/contents/${id}/processes` })
       .then((result) => {
         this.data = result;
         this._fetch = null;
@@ -26,10 +27,28 @@ const Processes = {
   },
 
   destroy: function (content_id, process_id) {
-    return m.request({
-      method: "DELETE",
-      url: `api/contents/${content_id}/processes/${process_id}`,
-    });
+    return m
+      .request({
+        method: "DELETE",
+        url: `api/contents/${content_id}/processes/${process_id}`,
+      })
+      .then((termination) => this.waitForTermination(termination));
+  },
+
+  // Resolves once the server reports the process has stopped, checking
+  // less often the longer it takes.
+  waitForTermination: function (termination, delay = 250) {
+    if (termination.status !== "pending") {
+      return Promise.resolve(termination);
+    }
+
+    return new Promise((resolve) => setTimeout(resolve, delay))
+      .then(() =>
+        m.request({ method: "GET", url: `api/terminations/${termination.id}` }),
+      )
+      .then((result) =>
+        this.waitForTermination(result, Math.min(delay * 2, 4000)),
+      );
   },
 
   reset: function () {
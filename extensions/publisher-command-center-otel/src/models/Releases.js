@@ -1,4 +1,4 @@
-import m from "mithril";
+import request from "./request";
 
 export default {
   data: null,
@@ -13,8 +13,7 @@ export default {
       return this._fetch;
     }
 
-    this._fetch = m
-      .request({ method: "GET", url: `api/contents/${id}/releases` })
+    this._fetch = request({ url: `api/contents/${id}/releases` })
       .then((result) => {
         this.data = result;
         this._fetch = null;
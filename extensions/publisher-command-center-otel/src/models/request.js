@@ -0,0 +1,61 @@
+import m from "mithril";
+
+// The last response body and ETag of recent GETs, so that asking again sends
+// If-None-Match and a 304 reuses the body already downloaded
+const responses = new Map();
+const MAX_RESPONSES = 100;
+
+function responseKey(url, params) {
+  return `${url}?${m.buildQueryString(params)}`;
+}
+
+function remember(key, etag, body) {
+  // Re-inserted so the Map stays ordered from least to most recent
+  responses.delete(key);
+  responses.set(key, { etag, body });
+  if (responses.size > MAX_RESPONSES) {
+    responses.delete(responses.keys().next().value);
+  }
+}
+
+// Whether a response to this GET is kept to revalidate
+export function isRemembered({ url, params = {} }) {
+  return responses.has(responseKey(url, params));
+}
+
+// Keeps `data` as the response to this GET with the given ETag, for a model
+// that fetched the same document some other way, such as streamed
+export function rememberResponse({ url, params = {} }, etag, data) {
+  remember(responseKey(url, params), etag, JSON.stringify(data));
+}
+
+// A GET through m.request that revalidates against the previous response.
+// The body is kept as text and parsed on every use, so models are free to
+// modify what they are given.
+export default function request({ url, params = {} }) {
+  const key = responseKey(url, params);
+  const previous = responses.get(key);
+
+  return m.request({
+    method: "GET",
+    url,
+    params,
+    headers: previous ? { "If-None-Match": previous.etag } : {},
+    extract: (xhr) => {
+      if (xhr.status === 304) {
+        return JSON.parse(previous.body);
+      }
+      if (xhr.status < 200 || xhr.status >= 300) {
+        const error = new Error(xhr.responseText);
+        error.code = xhr.status;
+        throw error;
+      }
+
+      const etag = xhr.getResponseHeader("ETag");
+      if (etag) {
+        remember(key, etag, xhr.responseText);
+      }
+      return JSON.parse(xhr.responseText);
+    },
+  });
+}
@@ -0,0 +1,82 @@
+"""
+Cached Connect responses must keep working after the visitor client they
+were read with has been dropped from the visitor client cache. The app is
+run against the mock Connect server from the benchmarks.
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+
+import pytest
+from cachetools.keys import hashkey
+
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EXTENSION_DIR)
+sys.path.insert(0, os.path.join(EXTENSION_DIR, "benchmarks"))
+
+import load  # noqa: E402
+import mock_connect  # noqa: E402
+
+GUID = mock_connect.content_json(1)["guid"]
+TOKEN = "visitor-token"
+
+
+@pytest.fixture(scope="module")
+def app(tmp_path_factory):
+    """The app, imported once a mock Connect is up to connect to"""
+    url, _ = load.start_mock(contents=3, latency=0, jitter=0)
+    os.environ["CONNECT_SERVER"] = url
+
+    # The app serves the built frontend from ./dist
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    os.mkdir("dist")
+    try:
+        import app
+
+        yield app
+    finally:
+        os.chdir(cwd)
+
+
+def add_visitor(app, token: str):
+    """Cache a client for `token` as if the visitor had just arrived"""
+    visitor = app.connect.Client(app.client.cfg.url, "unused")
+    with app.client_cache_lock:
+        app.client_cache[hashkey(token)] = visitor
+    return visitor
+
+
+def evict_visitors(app):
+    """Expire every cached visitor client, and let the evicted ones be freed"""
+    with app.client_cache_lock:
+        app.client_cache.expire(time.monotonic() + 2 * app.client_cache.ttl)
+    gc.collect()
+
+
+def test_cached_content_outlives_evicted_client(app):
+    visitor = add_visitor(app, TOKEN)
+    asyncio.run(app.get_content(visitor, TOKEN, GUID))
+    del visitor
+    evict_visitors(app)
+
+    visitor = add_visitor(app, TOKEN)
+    content = asyncio.run(app.get_content(visitor, TOKEN, GUID))
+    # Reading through the cached item needs a live client
+    assert content.jobs.find("job-1-0")["key"] == "job-1-0"
+
+
+def test_read_finishing_after_eviction_is_not_cached(app):
+    evict_visitors(app)
+    visitor = add_visitor(app, TOKEN)
+
+    def read_while_evicted():
+        evict_visitors(app)
+        return visitor.content.get(GUID)
+
+    asyncio.run(app.cached_read(TOKEN, "content", GUID, read_while_evicted))
+    with app.response_cache_lock:
+        assert (TOKEN, "content", GUID) not in app.response_cache
@@ -1,4 +1,48 @@
 import { defineConfig } from "vite";
+import { readdirSync, readFileSync, writeFileSync } from "node:fs";
+import { join, resolve } from "node:path";
+import { brotliCompressSync, constants, gzipSync } from "node:zlib";
+
+// Writes a .br and a .gz copy of each text asset next to it once the bundle
+// is built, so the server can send them as they are to clients that accept
+// them instead of compressing on every request.
+function precompress({ minimumSize = 1024 } = {}) {
+  const compressible = /\.(js|css|html|svg|json|txt)$/;
+  let outDir;
+
+  const files = (dir) =>
+    readdirSync(dir, { withFileTypes: true }).flatMap((entry) =>
+      entry.isDirectory()
+        ? files(join(dir, entry.name))
+        : [join(dir, entry.name)],
+    );
+
+  return {
+    name: "precompress",
+    apply: "build",
+    configResolved(config) {
+      outDir = resolve(config.root, config.build.outDir);
+    },
+    closeBundle() {
+      for (const file of files(outDir)) {
+        if (!compressible.test(file)) {
+          continue;
+        }
+        const content = readFileSync(file);
+        if (content.length < minimumSize) {
+          continue;
+        }
+        writeFileSync(
+          `${file}.br`,
+          brotliCompressSync(content, {
+            params: { [constants.BROTLI_PARAM_QUALITY]: 11 },
+          }),
+        );
+        writeFileSync(`${file}.gz`, gzipSync(content, { level: 9 }));
+      }
+    },
+  };
+}
 
 export default defineConfig({
   esbuild: {
@@ -6,6 +50,7 @@ export default defineConfig({
     jsxFactory: "m",
     jsxFragment: "'['",
   },
+  plugins: [precompress()],
   preview: {
     proxy: {
       "/api": {